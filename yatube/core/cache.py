@@ -0,0 +1,451 @@
+"""
+Бэкенды кеша, общие для всех процессов сервера.
+
+`SQLiteCache` хранит записи в файле SQLite (режим WAL): его видят все
+воркеры на машине без отдельного сервиса, а `incr` атомарен между
+процессами, что нужно счётчикам поколений лент (posts/cache.py).
+
+`TwoTierCache` ставит перед общим кешем небольшой LRU в памяти
+процесса. Другие процессы не узнают, что запись изменилась, поэтому
+локально хранятся только ключи с префиксами из LOCAL_PREFIXES: такие
+ключи содержат версию данных (карточки, страницы лент) или указывают
+на неизменяемые данные, и запись по ним никогда не меняется. `incr()`
+по таким ключам запрещён. Остальные ключи, например счётчики
+поколений, всегда читаются из общего кеша. `clear()` меняет эпоху в
+общем кеше, и остальные процессы очищают свой LRU при следующей
+проверке эпохи.
+
+Оба уровня считают попадания и промахи по префиксу ключа (часть до
+первого ':'); сводку по всем процессам выводит `manage.py cache_stats`.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+STATS_KEY_PREFIX = 'cache_stats'
+STATS_PREFIXES_KEY = f'{STATS_KEY_PREFIX}:prefixes'
+STATS_OUTCOMES = ('local_hits', 'shared_hits', 'misses')
+EPOCH_KEY = 'two_tier_epoch'
+
+
+def key_prefix(key):
+    return key.split(':', 1)[0]
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite; LOCATION - путь к файлу."""
+
+    # Записей, после которых проверяется переполнение
+    CULL_EVERY = 256
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # Соединение на поток; после fork открывается заново
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self.location, timeout=30, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL'
+                ') WITHOUT ROWID'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+            )
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _write(self, sql, params=(), many=False):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if many:
+                connection.executemany(sql, params)
+            else:
+                connection.execute(sql, params)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._writes += 1
+        if self._writes % self.CULL_EVERY == 0:
+            self._cull()
+
+    def _cull(self):
+        connection = self._connection()
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        count = connection.execute('SELECT count(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires LIMIT ?)',
+                (count // self._cull_frequency,),
+            )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def get(self, key, default=None, version=None):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._connection().execute(
+            f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+            f'AND (expires IS NULL OR expires > ?)',
+            (*keys, time.time()),
+        )
+        return {keys[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self._expires(timeout),
+            ),
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        self._write(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            [
+                (
+                    self._key(key, version),
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                    expires,
+                ) for key, value in data.items()
+            ],
+            many=True,
+        )
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (
+                    key,
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                    self._expires(timeout),
+                ),
+            ).rowcount
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return bool(added)
+
+    def incr(self, key, delta=1, version=None):
+        # Чтение и запись под одной блокировкой записи базы: между
+        # процессами приращения не теряются
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        connection = self._connection()
+        updated = connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        ).rowcount
+        return bool(updated)
+
+    def has_key(self, key, version=None):
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self._write(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def delete_many(self, keys, version=None):
+        self._write(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys],
+            many=True,
+        )
+
+    def clear(self):
+        self._write('DELETE FROM cache')
+
+
+class TwoTierCache(BaseCache):
+    """
+    LRU в памяти процесса перед общим кешем.
+
+    LOCATION - имя общего кеша в CACHES. OPTIONS: LOCAL_MAX_ENTRIES,
+    LOCAL_TIMEOUT (сколько секунд запись живёт в LRU; запись через set()
+    живёт не дольше своего timeout),
+    EPOCH_CHECK_INTERVAL, STATS_FLUSH_INTERVAL и LOCAL_PREFIXES
+    (префиксы неизменяемых ключей, которые можно хранить в LRU).
+    """
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        super().__init__(params)
+        self.shared_alias = location
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 300)
+        self.epoch_check_interval = options.get('EPOCH_CHECK_INTERVAL', 1)
+        self.stats_flush_interval = options.get('STATS_FLUSH_INTERVAL', 10)
+        self.local_prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._epoch = None
+        self._epoch_checked = 0
+        self._stats = Counter()
+        self._stats_flushed = time.monotonic()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _is_local(self, key):
+        return bool(self.local_prefixes) and key.startswith(
+            self.local_prefixes
+        )
+
+    # Локальный уровень
+
+    def _check_epoch(self):
+        now = time.monotonic()
+        if now - self._epoch_checked < self.epoch_check_interval:
+            return
+        self._epoch_checked = now
+        epoch = self.shared.get(EPOCH_KEY)
+        if epoch != self._epoch:
+            with self._lock:
+                self._local.clear()
+            self._epoch = epoch
+
+    def _local_get(self, key):
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return item
+
+    def _local_lifetime(self, timeout):
+        # Запись не переживает срок, заданный при записи в общий кеш
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _local_set(self, key, local_key, value, timeout=None):
+        if not self._is_local(key):
+            return
+        lifetime = self._local_lifetime(timeout)
+        if lifetime <= 0:
+            self._local_discard(local_key)
+            return
+        with self._lock:
+            self._local[local_key] = (value, time.monotonic() + lifetime)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_discard(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    # Статистика
+
+    def _count(self, key, outcome, number=1):
+        if key.startswith(STATS_KEY_PREFIX) or key == EPOCH_KEY:
+            return
+        with self._lock:
+            self._stats[key_prefix(key), outcome] += number
+        if time.monotonic() - self._stats_flushed > self.stats_flush_interval:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Добавляет накопленные счётчики в общий кеш."""
+        with self._lock:
+            stats, self._stats = self._stats, Counter()
+            self._stats_flushed = time.monotonic()
+        if not stats:
+            return
+        shared = self.shared
+        prefixes = set(shared.get(STATS_PREFIXES_KEY) or ())
+        new_prefixes = {prefix for prefix, outcome in stats} - prefixes
+        if new_prefixes:
+            shared.set(
+                STATS_PREFIXES_KEY, prefixes | new_prefixes, timeout=None
+            )
+        for (prefix, outcome), number in stats.items():
+            stats_key = f'{STATS_KEY_PREFIX}:{prefix}:{outcome}'
+            if not shared.add(stats_key, number, timeout=None):
+                shared.incr(stats_key, number)
+
+    def local_stats(self):
+        """Счётчики этого процесса, ещё не перенесённые в общий кеш."""
+        with self._lock:
+            return dict(self._stats)
+
+    # Интерфейс кеша
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if self._is_local(key):
+            self._check_epoch()
+            item = self._local_get(local_key)
+            if item is not None:
+                self._count(key, 'local_hits')
+                return item[0]
+        missing = object()
+        value = self.shared.get(key, missing, version=version)
+        if value is missing:
+            self._count(key, 'misses')
+            return default
+        self._count(key, 'shared_hits')
+        self._local_set(key, local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        if any(self._is_local(key) for key in keys):
+            self._check_epoch()
+        for key in keys:
+            if not self._is_local(key):
+                continue
+            item = self._local_get(self._local_key(key, version))
+            if item is not None:
+                found[key] = item[0]
+                self._count(key, 'local_hits')
+        rest = [key for key in keys if key not in found]
+        shared = self.shared.get_many(rest, version=version) if rest else {}
+        for key in rest:
+            if key in shared:
+                found[key] = shared[key]
+                self._count(key, 'shared_hits')
+                self._local_set(
+                    key, self._local_key(key, version), shared[key]
+                )
+            else:
+                self._count(key, 'misses')
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(key, self._local_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(
+                    key, self._local_key(key, version), value, timeout
+                )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local_discard(self._local_key(key, version))
+        return self.shared.add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        if self._is_local(key):
+            # Остальные процессы продолжили бы читать старое значение
+            raise ValueError(f"Key '{key}' is kept in the local tier")
+        return self.shared.incr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self._local_discard(self._local_key(key, version))
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._local_discard(*(self._local_key(key, version) for key in keys))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.shared.clear()
+        with self._lock:
+            self._local.clear()
+        # Новая эпоха: остальные процессы очистят свой LRU
+        self._epoch = time.time_ns()
+        self.shared.set(EPOCH_KEY, self._epoch, timeout=None)
+        self._epoch_checked = time.monotonic()
@@ -0,0 +1,44 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import (
+    STATS_KEY_PREFIX, STATS_OUTCOMES, STATS_PREFIXES_KEY, TwoTierCache
+)
+
+
+class Command(BaseCommand):
+    help = 'Доля попаданий в кеш по префиксам ключей по всем процессам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+        parser.add_argument(
+            '--reset', action='store_true', help='Обнулить счётчики.'
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not isinstance(cache, TwoTierCache):
+            raise CommandError(f'{options["alias"]} - не TwoTierCache')
+        cache.flush_stats()
+        shared = cache.shared
+        prefixes = sorted(shared.get(STATS_PREFIXES_KEY) or ())
+        keys = [
+            f'{STATS_KEY_PREFIX}:{prefix}:{outcome}'
+            for prefix in prefixes for outcome in STATS_OUTCOMES
+        ]
+        if options['reset']:
+            shared.delete_many([STATS_PREFIXES_KEY, *keys])
+            self.stdout.write('Счётчики обнулены')
+            return
+        values = shared.get_many(keys)
+        for prefix in prefixes:
+            local, shared_hits, misses = (
+                values.get(f'{STATS_KEY_PREFIX}:{prefix}:{outcome}', 0)
+                for outcome in STATS_OUTCOMES
+            )
+            total = local + shared_hits + misses
+            ratio = (local + shared_hits) / total if total else 0
+            self.stdout.write(
+                f'{prefix}: {ratio:.1%} попаданий из {total} '
+                f'(LRU {local}, общий кеш {shared_hits}, промахов {misses})'
+            )
@@ -0,0 +1,54 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.replicas import is_replica
+from core.sqlite.utils import snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет копии основной базы SQLite, которые служат репликами '
+        '(DATABASE_REPLICAS).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Реплики; по умолчанию все из DATABASE_REPLICAS.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд; 0 - обновить один раз.',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('Реплики не настроены: DATABASE_REPLICAS пуст')
+        for alias in ['default', *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} - не SQLite')
+        for alias in aliases:
+            if not is_replica(alias):
+                raise CommandError(f'{alias} - не реплика')
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                self.refresh(alias)
+                self.stdout.write(
+                    f'{alias}: {time.perf_counter() - started:.2f} с'
+                )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def refresh(self, alias):
+        target = connections[alias].settings_dict['NAME']
+        temp = f'{target}.tmp'
+        snapshot(connections['default'], temp)
+        # Открытые соединения дочитывают старый файл
+        os.replace(temp, target)
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.metrics import MetricsAggregate
+
+
+class Command(BaseCommand):
+    help = 'Сводит строки лога core.metrics по именам URL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('logfile', nargs='+')
+
+    def handle(self, *args, **options):
+        aggregate = MetricsAggregate()
+        for path in options['logfile']:
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    # В строке лога перед JSON может быть префикс формата
+                    start = line.find('{')
+                    if start == -1:
+                        continue
+                    try:
+                        aggregate.add(json.loads(line[start:]))
+                    except (ValueError, KeyError):
+                        continue
+        self.stdout.write(
+            json.dumps(aggregate.summary(), ensure_ascii=False, indent=2)
+        )
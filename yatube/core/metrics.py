@@ -0,0 +1,309 @@
+"""
+Метрики запроса: SQL, шаблоны и кеш.
+
+`RequestMetricsMiddleware` (включается настройкой REQUEST_METRICS)
+открывает на время запроса объект `RequestMetrics` и подключает к
+соединениям с базой `connection.execute_wrapper`. Шаблоны и кеш
+Django хуков не дают, поэтому `install()` один раз оборачивает
+`Template.render` и `get`/`get_many` бэкендов кеша: вне запроса с
+метриками обёртки ничего не делают.
+
+Итоги запроса уходят в заголовок Server-Timing, строкой JSON в лог
+`core.metrics` и в сводку по имени URL (`aggregate`).
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+# Сколько самых медленных шаблонов попадает в лог
+LOGGED_TEMPLATES = 5
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.templates = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._template_depth = 0
+        self._cache_depth = 0
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        """Число лишних повторов одинаковых запросов (SQL и параметры)."""
+        return sum(count - 1 for count in self.queries.values())
+
+    def as_dict(self):
+        return {
+            'queries': self.query_count,
+            'duplicates': self.duplicates,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'total_ms': round(
+                (time.perf_counter() - self.started) * 1000, 2
+            ),
+        }
+
+
+def current():
+    """Метрики текущего запроса или None."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries[(sql, repr(params))] += 1
+
+
+@contextmanager
+def collect():
+    """Собирает метрики всех запросов к базе внутри блока."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record_query))
+            yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, context)
+        # Время include входит во время внешнего шаблона: в общий
+        # итог идёт только самый внешний render
+        metrics._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics._template_depth -= 1
+            metrics.templates[self.name or '<string>'] += elapsed
+            if not metrics._template_depth:
+                metrics.template_time += elapsed
+    wrapper.metrics_wrapped = True
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics._cache_depth:
+            return get(self, key, default, version)
+        metrics._cache_depth += 1
+        missing = object()
+        try:
+            value = get(self, key, missing, version)
+        finally:
+            metrics._cache_depth -= 1
+        if value is missing:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    wrapper.metrics_wrapped = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics._cache_depth:
+            return get_many(self, keys, version)
+        # BaseCache.get_many вызывает get: такие вызовы не считаем
+        metrics._cache_depth += 1
+        try:
+            keys = list(keys)
+            values = get_many(self, keys, version)
+        finally:
+            metrics._cache_depth -= 1
+        metrics.cache_hits += len(values)
+        metrics.cache_misses += len(keys) - len(values)
+        return values
+    wrapper.metrics_wrapped = True
+    return wrapper
+
+
+def _wrap(owner, name, decorator):
+    method = getattr(owner, name)
+    if not getattr(method, 'metrics_wrapped', False):
+        setattr(owner, name, decorator(method))
+
+
+def install():
+    """Оборачивает Template.render и чтение из бэкендов кеша."""
+    _wrap(Template, 'render', _timed_render)
+    for options in settings.CACHES.values():
+        backend = import_string(options['BACKEND'])
+        _wrap(backend, 'get', _counted_get)
+        _wrap(backend, 'get_many', _counted_get_many)
+
+
+class URLStats:
+    """Суммы полей и выборка общего времени запросов одного URL."""
+
+    def __init__(self, sample_size):
+        self.requests = 0
+        self.sums = Counter()
+        self.sample = []
+        self.sample_size = sample_size
+
+    def add(self, values):
+        self.requests += 1
+        self.sums.update(values)
+        # Равномерная выборка (reservoir sampling): память не растёт с
+        # числом запросов, а перцентили оцениваются по всем запросам
+        if len(self.sample) < self.sample_size:
+            self.sample.append(values['total_ms'])
+            return
+        index = random.randrange(self.requests)
+        if index < self.sample_size:
+            self.sample[index] = values['total_ms']
+
+
+class MetricsAggregate:
+    """Сводка метрик по имени URL."""
+
+    FIELDS = ('queries', 'duplicates', 'db_ms', 'template_ms',
+              'cache_hits', 'cache_misses', 'total_ms')
+
+    # Сколько значений общего времени хранится для перцентилей
+    SAMPLE_SIZE = 1000
+
+    def __init__(self, sample_size=None):
+        self.sample_size = sample_size or self.SAMPLE_SIZE
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def add(self, record):
+        values = {field: record[field] for field in self.FIELDS}
+        with self._lock:
+            stats = self._stats.get(record['url_name'])
+            if stats is None:
+                stats = self._stats[record['url_name']] = URLStats(
+                    self.sample_size
+                )
+            stats.add(values)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self):
+        """Среднее по каждому полю и p50/p95 общего времени."""
+        with self._lock:
+            stats = {
+                name: (url.requests, dict(url.sums), sorted(url.sample))
+                for name, url in self._stats.items()
+            }
+        summary = {}
+        for name, (requests, sums, total) in stats.items():
+            summary[name] = {
+                'requests': requests,
+                **{
+                    f'avg_{field}': round(sums.get(field, 0) / requests, 2)
+                    for field in self.FIELDS
+                },
+                'p50_ms': total[(len(total) - 1) // 2],
+                'p95_ms': total[max(0, round(len(total) * 0.95) - 1)],
+            }
+        return summary
+
+
+aggregate = MetricsAggregate()
+
+
+def url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else None
+
+
+def server_timing(values):
+    return ', '.join([
+        f'db;dur={values["db_ms"]};desc="{values["queries"]} queries, '
+        f'{values["duplicates"]} duplicates"',
+        f'tpl;dur={values["template_ms"]}',
+        f'cache;desc="{values["cache_hits"]} hits, '
+        f'{values["cache_misses"]} misses"',
+        f'total;dur={values["total_ms"]}',
+    ])
+
+
+class RequestMetricsMiddleware:
+    """Считает SQL, шаблоны и обращения к кешу за время запроса."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect() as metrics:
+            response = self.get_response(request)
+        values = metrics.as_dict()
+        response['Server-Timing'] = server_timing(values)
+        record = {
+            'url_name': url_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **values,
+        }
+        aggregate.add(record)
+        slowest = sorted(
+            metrics.templates.items(), key=lambda item: -item[1]
+        )[:LOGGED_TEMPLATES]
+        logger.info(json.dumps(
+            {
+                **record,
+                'templates': {
+                    name: round(elapsed * 1000, 2)
+                    for name, elapsed in slowest
+                },
+            },
+            ensure_ascii=False,
+        ))
+        return response
@@ -0,0 +1,122 @@
+"""
+Чтение из реплик базы.
+
+Вьюхи, обёрнутые `read_replica`, читают из одной из баз
+DATABASE_REPLICAS (одной на весь запрос), все записи идут в основную
+базу. Реплика может отставать, поэтому:
+
+- после записи в том же запросе чтение возвращается в основную базу;
+- `PrimaryPinMiddleware` после запроса с записью ставит куку, и
+  REPLICA_PIN_SECONDS запросы этого клиента читают из основной базы:
+  пользователь сразу видит свой пост, комментарий или подписку;
+- страница, прочитанная из реплики, кешируется не дольше
+  REPLICA_CACHE_TIMEOUT, а её ETag меняется с тем же периодом, чтобы
+  отставшая страница не закрепилась за новым поколением ленты.
+
+Для разработки реплика - копия файла основной базы, которую
+обновляет команда `manage.py refresh_replicas`.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_cache_control
+
+
+PIN_COOKIE = 'pin_primary'
+
+# Реплика, выбранная для чтения в текущем запросе
+_replica = ContextVar('read_replica', default=None)
+# Была ли в текущем запросе запись в основную базу
+_wrote = ContextVar('primary_write', default=False)
+
+
+def is_replica(alias):
+    """
+    Реплика - база из DATABASE_REPLICAS или любая база, которая в
+    тестах зеркалит другую (TEST MIRROR), даже если сейчас не включена.
+    """
+    return alias in settings.DATABASE_REPLICAS or bool(
+        connections[alias].settings_dict['TEST'].get('MIRROR')
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _wrote.get():
+            return 'default'
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема реплики приходит вместе с копией основной базы
+        return not is_replica(db)
+
+
+def pinned(request):
+    """Читает ли клиент из основной базы после недавней записи."""
+    return PIN_COOKIE in request.COOKIES
+
+
+def uses_replica(request):
+    return bool(settings.DATABASE_REPLICAS) and not pinned(request)
+
+
+def staleness_tag(request):
+    """
+    Добавка к ETag страницы: для чтения из реплики меняется раз в
+    REPLICA_CACHE_TIMEOUT, для основной базы пустая.
+    """
+    if not uses_replica(request):
+        return ''
+    return str(int(time.time() // settings.REPLICA_CACHE_TIMEOUT))
+
+
+def read_replica(view_func):
+    """Читать данные вьюхи из реплики, если клиент не закреплён."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not uses_replica(request):
+            return view_func(request, *args, **kwargs)
+        token = _replica.set(random.choice(settings.DATABASE_REPLICAS))
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+        # cache_page берёт время жизни из max-age ответа
+        patch_cache_control(response, max_age=settings.REPLICA_CACHE_TIMEOUT)
+        return response
+    return _wrapped_view
+
+
+class PrimaryPinMiddleware:
+    """После записи закрепляет клиента за основной базой."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    PIN_COOKIE,
+                    '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        finally:
+            _wrote.reset(token)
+        return response
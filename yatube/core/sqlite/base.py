@@ -0,0 +1,89 @@
+"""
+SQLite для рабочей нагрузки.
+
+Стандартный бэкенд открывает соединение на каждый запрос и оставляет
+журнал отката: пишущая транзакция блокирует читателей, а две
+транзакции, начавшие с чтения, не могут обе перейти к записи и
+сразу получают "database is locked", не дожидаясь busy_timeout.
+Этот бэкенд добавляет опции (названия как в новых версиях Django):
+
+- OPTIONS['init_command'] - команды через ';', которые выполняются на
+  каждом новом соединении (PRAGMA journal_mode, mmap_size и т. п.);
+- OPTIONS['transaction_mode'] - транзакции начинаются с
+  BEGIN IMMEDIATE: блокировка записи берётся сразу и ожидается по
+  busy_timeout, а не обрывается посреди транзакции;
+- CONN_HEALTH_CHECKS - постоянное соединение (CONN_MAX_AGE) проверяется
+  запросом SELECT 1 один раз за запрос: при первом обращении к базе
+  после close_old_connections(), как в Django 4.1.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+from django.db.backends.sqlite3.base import Database
+
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}'
+            )
+        return mode
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('init_command', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def connect(self):
+        super().connect()
+        # Новое соединение проверять незачем
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        self._close_if_health_check_failed()
+        super().ensure_connection()
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict['OPTIONS'].get('init_command', '')
+        for statement in init_command.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def _close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or self.health_check_done
+            or not self.settings_dict.get('CONN_HEALTH_CHECKS')
+            or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Вызывается в начале и в конце запроса: соединение, оставшееся
+        # открытым, проверится при первом обращении к базе
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
@@ -0,0 +1,15 @@
+import sqlite3
+from contextlib import closing
+
+
+def snapshot(connection, path):
+    """
+    Копирует базу SQLite соединения Django `connection` в файл `path`
+    (backup API: запись в базу на время копирования не блокируется).
+    """
+    connection.ensure_connection()
+    with closing(sqlite3.connect(path)) as copy:
+        connection.connection.backup(copy)
+        # Копию читают другие процессы с другим профилем соединения:
+        # старые -wal/-shm не должны достаться новому файлу
+        copy.execute('PRAGMA journal_mode=DELETE')
@@ -0,0 +1,155 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import SQLiteCache, TwoTierCache
+
+
+TEMP_DIR = tempfile.mkdtemp()
+SHARED_LOCATION = str(Path(TEMP_DIR) / 'cache.sqlite3')
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'EPOCH_CHECK_INTERVAL': 0,
+            'LOCAL_PREFIXES': ['post_card'],
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': SHARED_LOCATION,
+    },
+}
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = SQLiteCache(SHARED_LOCATION, {})
+        self.cache.clear()
+
+    def test_basic_operations(self):
+        """Проверка: запись, чтение, add, incr и удаление."""
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 1))
+        self.assertEqual(self.cache.incr('new', 2), 3)
+        self.assertEqual(
+            self.cache.get_many(['key', 'new', 'missing']),
+            {'key': {'a': 1}, 'new': 3},
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_entries_are_missing(self):
+        """Проверка: устаревшая запись не читается и не мешает add."""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_shared_between_processes(self):
+        """Проверка: incr из нескольких процессов не теряет приращений."""
+        self.cache.set('counter', 0, timeout=None)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_increment, args=(SHARED_LOCATION, 50))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+
+@override_settings(CACHES=CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = caches['default']
+        self.cache.clear()
+        # Второй «процесс» с собственным LRU над тем же общим кешем
+        self.other = TwoTierCache('shared', CACHES['default'])
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Проверка: повторное чтение берётся из памяти процесса."""
+        self.cache.set('post_card:1', 'html')
+        self.cache.shared.set('post_card:1', 'changed')
+        self.assertEqual(self.cache.get('post_card:1'), 'html')
+        self.assertEqual(self.other.get('post_card:1'), 'changed')
+
+    def test_other_prefixes_read_shared(self):
+        """Проверка: изменяемые ключи всегда читаются из общего кеша."""
+        self.cache.set('feed_gen:1', 1)
+        self.other.incr('feed_gen:1')
+        self.assertEqual(self.cache.get('feed_gen:1'), 2)
+        self.assertEqual(self.cache.get_many(['feed_gen:1']), {
+            'feed_gen:1': 2
+        })
+        self.other.set('feed_gen:1', 5)
+        self.assertEqual(self.cache.get('feed_gen:1'), 5)
+        self.other.delete('feed_gen:1')
+        self.assertIsNone(self.cache.get('feed_gen:1'))
+
+    def test_local_tier_respects_timeout(self):
+        """Проверка: запись в LRU живёт не дольше своего timeout."""
+        self.cache.set('post_card:1', 'html', timeout=0.05)
+        self.cache.set_many({'post_card:2': 'html'}, timeout=0.05)
+        self.cache.set('post_card:3', 'html', timeout=0)
+        self.cache.shared.set('post_card:3', 'shared')
+        self.assertEqual(self.cache.get('post_card:3'), 'shared')
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('post_card:1'))
+        self.assertEqual(self.cache.get_many(['post_card:2']), {})
+
+    def test_incr_local_prefix(self):
+        """Проверка: ключи локального уровня нельзя увеличивать."""
+        self.cache.set('post_card:1', 1)
+        with self.assertRaises(ValueError):
+            self.cache.incr('post_card:1')
+
+    def test_clear_invalidates_other_processes(self):
+        """Проверка: clear() в одном процессе очищает LRU остальных."""
+        self.cache.set('post_card:1', 'html')
+        self.assertEqual(self.other.get('post_card:1'), 'html')
+        self.cache.clear()
+        self.assertIsNone(self.other.get('post_card:1'))
+
+    def test_hit_ratio_per_prefix(self):
+        """Проверка: доля попаданий считается по префиксам ключей."""
+        call_command('cache_stats', reset=True, stdout=StringIO())
+        self.cache.set('post_card:1', 'html')
+        self.cache.get('post_card:1')
+        self.other.get('post_card:1')
+        self.other.get_many(['post_card:2', 'feed_gen:1'])
+        self.other.flush_stats()
+        out = StringIO()
+        call_command('cache_stats', stdout=out)
+        self.assertIn(
+            'post_card: 66.7% попаданий из 3 '
+            '(LRU 1, общий кеш 1, промахов 1)',
+            out.getvalue(),
+        )
+        self.assertIn('feed_gen: 0.0% попаданий из 1', out.getvalue())
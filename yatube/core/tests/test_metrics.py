@@ -0,0 +1,106 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.metrics import MetricsAggregate, aggregate, collect
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_METRICS=True)
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        cache.clear()
+        aggregate.reset()
+
+    def get_logged(self, url):
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            response = self.client.get(url)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_server_timing_header(self):
+        """Проверка: Server-Timing содержит число запросов к базе."""
+        with CaptureQueriesContext(connection) as queries:
+            response, record = self.get_logged(reverse('posts:index'))
+        self.assertIn(
+            f'{len(queries)} queries', response['Server-Timing']
+        )
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, response['Server-Timing'])
+
+    def test_log_line(self):
+        """Проверка: в лог пишутся метрики запроса и время шаблонов."""
+        response, record = self.get_logged(reverse('posts:index'))
+        self.assertEqual(record['url_name'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertIn('posts/index.html', record['templates'])
+
+    def test_cache_hits_and_misses(self):
+        """Проверка: повторный запрос страницы берёт её из кеша."""
+        url = reverse('posts:index')
+        response, first = self.get_logged(url)
+        response, second = self.get_logged(url)
+        self.assertGreater(first['cache_misses'], 0)
+        self.assertGreater(second['cache_hits'], 0)
+        self.assertEqual(second['cache_misses'], 0)
+        self.assertEqual(second['template_ms'], 0)
+
+    def test_duplicates(self):
+        """Проверка: повтор того же запроса считается дубликатом."""
+        with collect() as metrics:
+            for _ in range(3):
+                list(Post.objects.filter(author=self.user))
+            list(Post.objects.all())
+        self.assertEqual(metrics.query_count, 4)
+        self.assertEqual(metrics.duplicates, 2)
+
+    def test_aggregate_by_url_name(self):
+        """Проверка: метрики сводятся по имени URL."""
+        for _ in range(2):
+            self.get_logged(reverse('posts:index'))
+        self.get_logged(
+            reverse('posts:profile', kwargs={'username': self.user.username})
+        )
+        summary = aggregate.summary()
+        self.assertEqual(summary['posts:index']['requests'], 2)
+        self.assertEqual(summary['posts:profile']['requests'], 1)
+
+    @override_settings(REQUEST_METRICS=False)
+    def test_disabled(self):
+        """Проверка: без настройки заголовок не добавляется."""
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class MetricsAggregateTests(SimpleTestCase):
+    def test_memory_bounded(self):
+        """Проверка: сводка хранит выборку, а средние - по всем запросам."""
+        summary = MetricsAggregate(sample_size=10)
+        for index in range(1, 101):
+            summary.add({
+                'url_name': 'posts:index',
+                **dict.fromkeys(MetricsAggregate.FIELDS, 0),
+                'total_ms': index,
+            })
+        self.assertEqual(len(summary._stats['posts:index'].sample), 10)
+        result = summary.summary()['posts:index']
+        self.assertEqual(result['requests'], 100)
+        self.assertEqual(result['avg_total_ms'], 50.5)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.replicas import PIN_COOKIE, ReplicaRouter
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    # В тестах реплика - зеркало основной базы
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='Author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            response = self.client.get(url)
+        return response, len(replica), len(primary)
+
+    def test_feeds_read_from_replica(self):
+        """Проверка: ленты и страница поста читают из реплики."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response, replica, _ = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(replica, 0)
+                self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_pinned_after_write(self):
+        """Проверка: после записи клиент читает из основной базы."""
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response, replica, primary = self.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+        self.assertContains(response, 'Комментарий')
+
+        self.client.cookies.pop(PIN_COOKIE)
+        _, replica, _ = self.get(reverse('posts:index'))
+        self.assertGreater(replica, 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Проверка: без реплик всё читается из основной базы."""
+        response, replica, _ = self.get(reverse('posts:index'))
+        self.assertEqual(replica, 0)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_migrations_on_replica(self):
+        """Проверка: миграции не пишут в реплику, даже выключенную."""
+        router = ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
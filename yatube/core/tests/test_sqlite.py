@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class SQLiteProfileTests(TestCase):
+    def test_init_command(self):
+        """Проверка: PRAGMA из init_command применены к соединению."""
+        pragmas = {
+            'busy_timeout': 5000,
+            'cache_size': -65536,
+            # NORMAL
+            'synchronous': 1,
+        }
+        with connection.cursor() as cursor:
+            for pragma, expected in pragmas.items():
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_health_check(self):
+        """Проверка: испорченное постоянное соединение закрывается."""
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.databases['health'] = {
+            **settings.DATABASES['default'],
+            'NAME': os.path.join(directory, 'health.sqlite3'),
+        }
+        self.addCleanup(connections.databases.pop, 'health')
+        health = connections['health']
+        health.ensure_connection()
+        health.close_if_unusable_or_obsolete()
+        self.assertIsNotNone(health.connection)
+        # Соединение закрыто в обход Django
+        health.connection.close()
+        health.close_if_unusable_or_obsolete()
+        with mock.patch.object(
+            health, 'is_usable', wraps=health.is_usable
+        ) as is_usable:
+            for _ in range(3):
+                with health.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+        # Проверка одна на запрос, испорченное соединение заменено
+        self.assertEqual(is_usable.call_count, 1)
+        self.assertTrue(health.is_usable())
+
+
+class SQLiteTransactionModeTests(TransactionTestCase):
+    def test_begin_immediate(self):
+        """Проверка: транзакция сразу берёт блокировку записи."""
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                pass
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
@@ -0,0 +1,70 @@
+"""
+Приём загружаемых файлов.
+
+Файлы, не помещающиеся в FILE_UPLOAD_MAX_MEMORY_SIZE, пишутся во
+временный файл на диске по частям. Запись прекращается, как только
+размер превысил MAX_UPLOAD_SIZE: остаток тела запроса читается, но не
+сохраняется, а у файла ставится признак `too_large`, по которому форма
+сообщает об ошибке.
+
+По мере приёма считается sha256 файла (атрибут `content_hash`): по нему
+находятся уже загруженные копии, не читая файл ещё раз.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler, TemporaryFileUploadHandler,
+)
+
+
+class HashingUploadMixin:
+    """Считает sha256 принятых этим обработчиком частей файла."""
+
+    def new_file(self, *args, **kwargs):
+        # До super(): MemoryFileUploadHandler завершает new_file
+        # исключением StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        passed = super().receive_data_chunk(raw_data, start)
+        if passed is None:
+            self.hasher.update(raw_data)
+        return passed
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.content_hash = self.hasher.hexdigest()
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(
+    HashingUploadMixin, MemoryFileUploadHandler
+):
+    """Небольшие загрузки в памяти, с хешем."""
+
+
+class LimitedTemporaryFileUploadHandler(
+    HashingUploadMixin, TemporaryFileUploadHandler
+):
+    """Загрузка во временный файл с ограничением размера и хешем."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file.too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.MAX_UPLOAD_SIZE:
+            self.file.too_large = True
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+
+def too_large(uploaded_file):
+    """Превышает ли загруженный файл MAX_UPLOAD_SIZE."""
+    return (
+        getattr(uploaded_file, 'too_large', False)
+        or uploaded_file.size > settings.MAX_UPLOAD_SIZE
+    )
@@ -0,0 +1,37 @@
+from django.contrib import admin
+
+from .models import Job, OutboxEmail
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'task',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'finished',
+    )
+    list_filter = ('status', 'task')
+    search_fields = ('task',)
+
+
+admin.site.register(Job, JobAdmin)
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'subject',
+        'status',
+        'attempts',
+        'created',
+        'sent',
+    )
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    exclude = ('message',)
+
+
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
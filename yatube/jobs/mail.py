@@ -0,0 +1,244 @@
+"""
+Исходящая почта через очередь.
+
+`OutboxBackend` (EMAIL_BACKEND) не отправляет письма, а записывает их в
+таблицу OutboxEmail в текущей транзакции: запрос не ждёт почтовый
+сервер, а письмо из откатившейся транзакции не уйдёт.
+
+`send_batch()` забирает пачку готовых писем так же, как очередь задач
+(jobs/queue.py), и отправляет их через одно соединение с настоящим
+бэкендом OUTBOX_EMAIL_BACKEND. Не отправленное письмо повторяется с
+экспоненциальной задержкой, пока не исчерпает OUTBOX_MAX_ATTEMPTS
+попыток. Если отправитель упадёт между отправкой и отметкой, письмо
+уйдёт ещё раз с тем же Message-ID.
+
+Отправку в цикле запускает `manage.py send_outbox`.
+"""
+import email
+import json
+import logging
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .queue import _percentiles, worker_name
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Бэкенд Django, который ставит письма в очередь."""
+
+    def send_messages(self, email_messages):
+        emails = []
+        for message in email_messages:
+            recipients = message.recipients()
+            if not recipients:
+                continue
+            emails.append(OutboxEmail(
+                subject=message.subject[:255],
+                from_email=message.from_email,
+                recipients=json.dumps(recipients),
+                # message() проверяет заголовки, как настоящие бэкенды
+                message=message.message().as_bytes(),
+            ))
+        OutboxEmail.objects.bulk_create(emails)
+        return len(emails)
+
+
+class StoredMIME(MIMEMixin, email.message.Message):
+    """Письмо из очереди, которое сериализуется как письма Django."""
+
+
+class StoredMessage(EmailMessage):
+    """Письмо из очереди для настоящего бэкенда."""
+
+    def __init__(self, outbox_email):
+        super().__init__(
+            subject=outbox_email.subject,
+            from_email=outbox_email.from_email,
+            to=json.loads(outbox_email.recipients),
+        )
+        self.raw = bytes(outbox_email.message)
+
+    def message(self):
+        return email.message_from_bytes(self.raw, _class=StoredMIME)
+
+
+def _ready(now):
+    return (
+        Q(status=OutboxEmail.QUEUED, run_at__lte=now)
+        | Q(status=OutboxEmail.SENDING, locked_until__lt=now)
+    )
+
+
+def claim(sender, limit):
+    """Забирает до `limit` готовых писем для отправителя `sender`."""
+    now = timezone.now()
+    token = f'{sender}:{uuid.uuid4().hex[:12]}'
+    ready = OutboxEmail.objects.filter(_ready(now)).order_by(
+        'run_at', 'pk'
+    ).values('pk')[:limit]
+    with transaction.atomic():
+        claimed = OutboxEmail.objects.filter(
+            _ready(now), pk__in=ready
+        ).update(
+            status=OutboxEmail.SENDING,
+            locked_by=token,
+            locked_until=now + timedelta(
+                seconds=settings.OUTBOX_VISIBILITY_TIMEOUT
+            ),
+            attempts=F('attempts') + 1,
+        )
+    if not claimed:
+        return token, []
+    emails = OutboxEmail.objects.filter(locked_by=token).order_by(
+        'run_at', 'pk'
+    )
+    return token, list(emails)
+
+
+def _retry(outbox_email, token, error):
+    if outbox_email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        fields = {'status': OutboxEmail.FAILED}
+    else:
+        delay = settings.OUTBOX_RETRY_DELAY * 2 ** (outbox_email.attempts - 1)
+        fields = {
+            'status': OutboxEmail.QUEUED,
+            'run_at': timezone.now() + timedelta(seconds=delay),
+            'locked_by': '',
+        }
+    OutboxEmail.objects.filter(pk=outbox_email.pk, locked_by=token).update(
+        locked_until=None, last_error=error, **fields
+    )
+
+
+def send_batch(sender=None, batch_size=None):
+    """
+    Отправляет пачку готовых писем через одно соединение. Возвращает
+    число отправленных и не отправленных писем.
+    """
+    sender = sender or worker_name()
+    token, emails = claim(sender, batch_size or settings.OUTBOX_BATCH_SIZE)
+    # Отправитель падал на каждой попытке
+    exhausted = [
+        outbox_email.pk for outbox_email in emails
+        if outbox_email.attempts > settings.OUTBOX_MAX_ATTEMPTS
+    ]
+    if exhausted:
+        OutboxEmail.objects.filter(pk__in=exhausted, locked_by=token).update(
+            status=OutboxEmail.FAILED,
+            locked_until=None,
+            last_error='Время отправки истекло на всех попытках',
+        )
+        emails = [
+            outbox_email for outbox_email in emails
+            if outbox_email.pk not in exhausted
+        ]
+    if not emails:
+        return 0, len(exhausted)
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception:
+        logger.exception('Нет соединения для отправки писем')
+        error = traceback.format_exc()
+        for outbox_email in emails:
+            _retry(outbox_email, token, error)
+        return 0, len(emails) + len(exhausted)
+    sent, failed = [], len(exhausted)
+    try:
+        for outbox_email in emails:
+            try:
+                connection.send_messages([StoredMessage(outbox_email)])
+            except Exception:
+                logger.exception('Письмо %s не отправлено', outbox_email)
+                _retry(outbox_email, token, traceback.format_exc())
+                failed += 1
+            else:
+                sent.append(outbox_email.pk)
+    finally:
+        connection.close()
+        OutboxEmail.objects.filter(pk__in=sent, locked_by=token).update(
+            status=OutboxEmail.SENT,
+            sent=timezone.now(),
+            locked_until=None,
+        )
+    return len(sent), failed
+
+
+def purge(keep=None):
+    """Удаляет отправленные письма старше `keep` (timedelta)."""
+    keep = keep or timedelta(seconds=settings.OUTBOX_KEEP_SENT)
+    deleted, _ = OutboxEmail.objects.filter(
+        status=OutboxEmail.SENT, sent__lt=timezone.now() - keep
+    ).delete()
+    return deleted
+
+
+def send_loop(stop, batch_size=None, poll_interval=None):
+    """Отправляет письма пачками до установки события `stop`."""
+    poll_interval = poll_interval or settings.OUTBOX_POLL_INTERVAL
+    sender = worker_name()
+    purged = time.monotonic()
+    while not stop.is_set():
+        close_old_connections()
+        started = time.perf_counter()
+        sent, failed = send_batch(sender, batch_size)
+        if sent or failed:
+            elapsed = time.perf_counter() - started
+            logger.info(
+                'Отправлено %s, не отправлено %s за %.2f с (%.1f писем/с)',
+                sent, failed, elapsed, sent / elapsed,
+            )
+        if time.monotonic() - purged > settings.JOBS_PURGE_INTERVAL:
+            purge()
+            purged = time.monotonic()
+        if not sent and not failed:
+            stop.wait(poll_interval)
+
+
+def stats(window=timedelta(hours=1)):
+    """
+    Глубина очереди писем, возраст самого старого неотправленного и
+    пропускная способность и задержка доставки за `window`.
+    """
+    now = timezone.now()
+    ready = OutboxEmail.objects.filter(_ready(now)).aggregate(
+        total=Count('pk'), oldest=Min('created')
+    )
+    by_status = dict(
+        OutboxEmail.objects.order_by().values_list('status').annotate(
+            total=Count('pk')
+        )
+    )
+    latencies = [
+        (sent - created).total_seconds() * 1000
+        for created, sent in OutboxEmail.objects.filter(
+            status=OutboxEmail.SENT, sent__gte=now - window
+        ).values_list('created', 'sent').iterator()
+    ]
+    return {
+        'ready': ready['total'],
+        'oldest_ready_s': (
+            round((now - ready['oldest']).total_seconds(), 1)
+            if ready['oldest'] else None
+        ),
+        'statuses': by_status,
+        'sent_in_window': len(latencies),
+        'sent_per_minute': round(
+            len(latencies) / (window.total_seconds() / 60), 2
+        ),
+        'latency': _percentiles(latencies),
+    }
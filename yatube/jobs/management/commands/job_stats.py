@@ -0,0 +1,26 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from jobs import mail
+from jobs.queue import stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Глубина очереди фоновых задач, возраст самой старой задачи и '
+        'задержки выполнения; то же для исходящих писем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int, default=60,
+            help='За сколько минут считать задержки выполненных задач.',
+        )
+
+    def handle(self, *args, **options):
+        window = timedelta(minutes=options['window'])
+        result = stats(window)
+        result['outbox'] = mail.stats(window)
+        self.stdout.write(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+from jobs.worker import run_pool
+
+
+class Command(BaseCommand):
+    help = 'Запускает процессы-исполнители фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS_WORKERS
+        )
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи в этом процессе и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            done = queue.work(batch_size=options['batch_size'])
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        self.stdout.write(f'Исполнителей: {options["processes"]}')
+        run_pool(
+            options['processes'],
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+        )
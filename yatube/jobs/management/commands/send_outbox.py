@@ -0,0 +1,54 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs import mail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из исходящей очереди пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--poll-interval', type=float,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Отправить готовые письма и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.send_ready(options['batch_size'])
+            return
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+        mail.send_loop(
+            stop,
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+        )
+
+    def send_ready(self, batch_size):
+        started = time.perf_counter()
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = mail.send_batch(batch_size=batch_size)
+            if not sent and not failed:
+                break
+            total_sent += sent
+            total_failed += failed
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Отправлено: {total_sent}, не отправлено: {total_failed}, '
+            f'{total_sent / elapsed:.1f} писем/с'
+        )
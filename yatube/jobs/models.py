@@ -0,0 +1,174 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди (см. jobs/queue.py)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    task = models.CharField(
+        verbose_name='Задача',
+        max_length=200
+    )
+    # Аргументы задачи в JSON: {"args": [...], "kwargs": {...}}
+    payload = models.TextField(
+        verbose_name='Аргументы',
+        default='{}'
+    )
+    priority = models.SmallIntegerField(
+        verbose_name='Приоритет',
+        default=0
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Наибольшее число попыток',
+        default=3
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Выполнить не раньше',
+        default=timezone.now
+    )
+    # Взятая задача невидима для других исполнителей до locked_until:
+    # если исполнитель упал, задачу потом возьмёт другой
+    locked_by = models.CharField(
+        verbose_name='Исполнитель',
+        max_length=100,
+        blank=True,
+        db_index=True
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Занята до',
+        blank=True,
+        null=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата постановки',
+        auto_now_add=True
+    )
+    started = models.DateTimeField(
+        verbose_name='Дата начала',
+        blank=True,
+        null=True
+    )
+    finished = models.DateTimeField(
+        verbose_name='Дата завершения',
+        blank=True,
+        null=True
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='jobs_job_ready_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
+
+
+class OutboxEmail(models.Model):
+    """Письмо в исходящей очереди (см. jobs/mail.py)."""
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField(
+        verbose_name='Тема',
+        max_length=255,
+        blank=True
+    )
+    from_email = models.CharField(
+        verbose_name='Отправитель',
+        max_length=255
+    )
+    # Адресаты конверта в JSON: to, cc и bcc вместе
+    recipients = models.TextField(
+        verbose_name='Адресаты'
+    )
+    # Письмо целиком в MIME: заголовки Date и Message-ID фиксируются
+    # при постановке и не меняются при повторах
+    message = models.BinaryField(
+        verbose_name='Письмо'
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Отправить не раньше',
+        default=timezone.now
+    )
+    locked_by = models.CharField(
+        verbose_name='Отправитель очереди',
+        max_length=100,
+        blank=True,
+        db_index=True
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Занято до',
+        blank=True,
+        null=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата постановки',
+        auto_now_add=True
+    )
+    sent = models.DateTimeField(
+        verbose_name='Дата отправки',
+        blank=True,
+        null=True
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='jobs_outbox_ready_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} #{self.pk}'
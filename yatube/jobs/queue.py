@@ -0,0 +1,306 @@
+"""
+Очередь фоновых задач в базе.
+
+Задача - функция, обёрнутая декоратором `task`. `enqueue()` (или
+`задача.delay()`) записывает вызов в таблицу Job в текущей транзакции.
+Если ставить задачу в той же транзакции, что и данные, которые её
+породили (как posts/views.py для миниатюр), задача не теряется при
+падении процесса и не видна исполнителям раньше этих данных.
+
+Исполнители (`manage.py run_workers`) забирают задачи пачками: один
+UPDATE ... WHERE id IN (SELECT ... LIMIT n) помечает их ключом
+исполнителя. В SQLite пишущие транзакции идут по одной, поэтому одну
+задачу не возьмут двое. Взятая задача невидима для других до
+`locked_until`; если исполнитель упал, по истечении этого времени её
+возьмёт другой. Упавшая задача повторяется с экспоненциальной
+задержкой, пока не исчерпает `max_attempts` попыток.
+
+С JOBS_EAGER задача выполняется сразу при постановке (тесты, отладка).
+"""
+import json
+import logging
+import os
+import socket
+import statistics
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, name, priority, max_attempts, timeout):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит вызов задачи в очередь с параметрами по умолчанию."""
+        return enqueue(self, args, kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+
+def task(name=None, priority=0, max_attempts=3, timeout=300):
+    """
+    Регистрирует функцию как фоновую задачу. Имя по умолчанию - путь
+    к функции: по нему исполнитель импортирует задачу. `timeout` -
+    сколько секунд задача невидима для других исполнителей.
+    """
+    def decorator(func):
+        registered = Task(
+            func,
+            name or f'{func.__module__}.{func.__name__}',
+            priority,
+            max_attempts,
+            timeout,
+        )
+        _registry[registered.name] = registered
+        return registered
+    return decorator
+
+
+def get_task(name):
+    if name not in _registry:
+        # Модуль задачи ещё не импортирован в этом процессе
+        import_string(name)
+    return _registry[name]
+
+
+def enqueue(task, args=(), kwargs=None, priority=None, delay=None):
+    """
+    Ставит вызов задачи в очередь. Аргументы должны сериализоваться в
+    JSON; `delay` - timedelta, раньше которой задачу не выполнять.
+    """
+    if isinstance(task, str):
+        task = get_task(task)
+    kwargs = kwargs or {}
+    if settings.JOBS_EAGER:
+        task(*args, **kwargs)
+        return None
+    return Job.objects.create(
+        task=task.name,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs}),
+        priority=task.priority if priority is None else priority,
+        max_attempts=task.max_attempts,
+        run_at=timezone.now() + (delay or timedelta(0)),
+    )
+
+
+def _ready(now):
+    # В очереди и пора выполнять, либо взятая, но исполнитель не
+    # отчитался до конца видимости
+    return (
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(worker, limit):
+    """Забирает до `limit` готовых задач для исполнителя `worker`."""
+    now = timezone.now()
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    ready = Job.objects.filter(_ready(now)).order_by(
+        '-priority', 'run_at', 'pk'
+    ).values('pk')[:limit]
+    with transaction.atomic():
+        claimed = Job.objects.filter(_ready(now), pk__in=ready).update(
+            status=Job.RUNNING,
+            locked_by=token,
+            locked_until=now + timedelta(
+                seconds=settings.JOBS_VISIBILITY_TIMEOUT
+            ),
+            attempts=F('attempts') + 1,
+            started=now,
+        )
+    if not claimed:
+        return token, []
+    jobs = Job.objects.filter(locked_by=token).order_by(
+        '-priority', 'run_at', 'pk'
+    )
+    return token, list(jobs)
+
+
+def release(jobs, token):
+    """
+    Возвращает в очередь взятые, но не начатые задачи (исполнитель
+    останавливается); попытка при этом не засчитывается.
+    """
+    return Job.objects.filter(
+        pk__in=[job.pk for job in jobs], locked_by=token
+    ).update(
+        status=Job.QUEUED,
+        locked_by='',
+        locked_until=None,
+        attempts=F('attempts') - 1,
+        started=None,
+    )
+
+
+def _finish(job, token, **fields):
+    return Job.objects.filter(pk=job.pk, locked_by=token).update(**fields)
+
+
+def run(job, token):
+    """
+    Выполняет взятую задачу и записывает итог. Возвращает False, если
+    задачу уже забрал другой исполнитель.
+    """
+    now = timezone.now()
+    if job.attempts > job.max_attempts:
+        # Исполнитель падал на каждой попытке
+        return bool(_finish(
+            job, token,
+            status=Job.FAILED,
+            finished=now,
+            locked_until=None,
+            last_error='Время выполнения истекло на всех попытках',
+        ))
+    try:
+        registered = get_task(job.task)
+    except (ImportError, KeyError):
+        return bool(_finish(
+            job, token,
+            status=Job.FAILED,
+            finished=now,
+            locked_until=None,
+            last_error=f'Неизвестная задача {job.task}',
+        ))
+    # Видимость на время задачи; заодно проверяем, что задача ещё наша
+    if not _finish(
+        job, token,
+        locked_until=now + timedelta(seconds=registered.timeout),
+    ):
+        return False
+    payload = json.loads(job.payload)
+    try:
+        registered(*payload.get('args', []), **payload.get('kwargs', {}))
+    except Exception:
+        logger.exception('Задача %s упала', job)
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            _finish(
+                job, token,
+                status=Job.FAILED,
+                finished=now,
+                locked_until=None,
+                last_error=error,
+            )
+        else:
+            retry = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _finish(
+                job, token,
+                status=Job.QUEUED,
+                run_at=now + timedelta(seconds=retry),
+                locked_by='',
+                locked_until=None,
+                last_error=error,
+            )
+    else:
+        _finish(
+            job, token,
+            status=Job.DONE,
+            finished=timezone.now(),
+            locked_until=None,
+        )
+    return True
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(worker=None, batch_size=None, limit=None):
+    """
+    Выполняет готовые задачи в текущем процессе, пока очередь не
+    опустеет (или `limit` задач). Возвращает число выполненных.
+    """
+    worker = worker or worker_name()
+    batch_size = batch_size or settings.JOBS_BATCH_SIZE
+    done = 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        token, jobs = claim(worker, size)
+        if not jobs:
+            break
+        for job in jobs:
+            done += run(job, token)
+            close_old_connections()
+    return done
+
+
+def purge(keep=None):
+    """Удаляет выполненные задачи старше `keep` (timedelta)."""
+    keep = keep or timedelta(seconds=settings.JOBS_KEEP_DONE)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, finished__lt=timezone.now() - keep
+    ).delete()
+    return deleted
+
+
+def _percentiles(values):
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None}
+    values = sorted(values)
+    index = max(0, round(len(values) * 0.95) - 1)
+    return {
+        'p50_ms': round(statistics.median(values), 1),
+        'p95_ms': round(values[index], 1),
+    }
+
+
+def stats(window=timedelta(hours=1)):
+    """
+    Глубина очереди по задачам, возраст самой старой готовой задачи и
+    задержка до начала и время выполнения задач за `window`.
+    """
+    now = timezone.now()
+    depth = dict(
+        Job.objects.filter(_ready(now)).order_by().values_list(
+            'task'
+        ).annotate(total=Count('pk'))
+    )
+    oldest = Job.objects.filter(_ready(now)).aggregate(
+        oldest=Min('run_at')
+    )['oldest']
+    by_status = dict(
+        Job.objects.order_by().values_list('status').annotate(
+            total=Count('pk')
+        )
+    )
+    waits, runs = [], []
+    for created, started, finished in Job.objects.filter(
+        status=Job.DONE, finished__gte=now - window
+    ).values_list('created', 'started', 'finished').iterator():
+        waits.append((started - created).total_seconds() * 1000)
+        runs.append((finished - started).total_seconds() * 1000)
+    return {
+        'ready': sum(depth.values()),
+        'ready_by_task': depth,
+        'oldest_ready_s': (
+            round((now - oldest).total_seconds(), 1) if oldest else None
+        ),
+        'statuses': by_status,
+        'done_in_window': len(runs),
+        'wait': _percentiles(waits),
+        'run': _percentiles(runs),
+    }
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import mail as outbox
+from jobs.models import OutboxEmail
+
+User = get_user_model()
+
+
+class CountingBackend(locmem.EmailBackend):
+    """Бэкенд писем в памяти, который считает соединения."""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bounce@example.com' in message.recipients():
+                raise ConnectionError('Адресат недоступен')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='jobs.mail.OutboxBackend',
+    OUTBOX_EMAIL_BACKEND='jobs.tests.test_mail.CountingBackend',
+    OUTBOX_MAX_ATTEMPTS=2,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        CountingBackend.opened = 0
+
+    def test_password_reset_queued(self):
+        """Проверка: письмо сброса пароля уходит через очередь."""
+        User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        response = self.client.post(
+            reverse('users:password_reset'), {'email': 'reader@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(outbox.send_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        message = mail.outbox[0].message()
+        self.assertIn('/reset/', message.get_payload(decode=True).decode())
+        self.assertTrue(message['Message-ID'])
+        self.assertEqual(
+            OutboxEmail.objects.get().status, OutboxEmail.SENT
+        )
+
+    def test_rollback(self):
+        """Проверка: письмо из откатившейся транзакции не отправляется."""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                mail.send_mail('Тема', 'Текст', None, ['a@example.com'])
+                raise RuntimeError
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_batch_one_connection(self):
+        """Проверка: пачка писем отправляется через одно соединение."""
+        for index in range(5):
+            mail.send_mail(
+                f'Письмо {index}', 'Текст', None, [f'{index}@example.com']
+            )
+        self.assertEqual(outbox.send_batch(batch_size=3), (3, 0))
+        self.assertEqual(outbox.send_batch(batch_size=3), (2, 0))
+        self.assertEqual(CountingBackend.opened, 2)
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            [f'Письмо {index}' for index in range(5)],
+        )
+        result = outbox.stats()
+        self.assertEqual(result['ready'], 0)
+        self.assertEqual(result['sent_in_window'], 5)
+        self.assertIsNotNone(result['latency']['p95_ms'])
+
+    def test_retry_then_fail(self):
+        """Проверка: неотправленное письмо повторяется, затем - ошибка."""
+        mail.send_mail('Тема', 'Текст', None, ['bounce@example.com'])
+        mail.send_mail('Тема', 'Текст', None, ['ok@example.com'])
+        with self.assertLogs('jobs.mail', 'ERROR'):
+            self.assertEqual(outbox.send_batch(), (1, 1))
+        bounced = OutboxEmail.objects.get(status=OutboxEmail.QUEUED)
+        self.assertGreater(bounced.run_at, timezone.now())
+        self.assertIn('Адресат недоступен', bounced.last_error)
+        self.assertEqual(outbox.send_batch(), (0, 0))
+
+        OutboxEmail.objects.filter(pk=bounced.pk).update(
+            run_at=timezone.now()
+        )
+        with self.assertLogs('jobs.mail', 'ERROR'):
+            self.assertEqual(outbox.send_batch(), (0, 1))
+        bounced.refresh_from_db()
+        self.assertEqual(bounced.status, OutboxEmail.FAILED)
+        self.assertEqual(len(mail.outbox), 1)
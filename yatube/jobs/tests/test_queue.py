@@ -0,0 +1,119 @@
+import json
+import threading
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from jobs.worker import worker_loop
+
+
+calls = []
+stop = threading.Event()
+
+
+@queue.task()
+def record(value):
+    calls.append(value)
+
+
+@queue.task(priority=1)
+def request_stop():
+    stop.set()
+
+
+@queue.task(max_attempts=2)
+def explode():
+    raise ValueError('Сбой задачи')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        calls.clear()
+        stop.clear()
+
+    def test_priority_order(self):
+        """Проверка: задачи выполняются по приоритету, затем по очереди."""
+        record.delay('первая')
+        queue.enqueue(record, ['срочная'], priority=5)
+        queue.enqueue(
+            'jobs.tests.test_queue.record', ['отложенная'],
+            delay=timedelta(hours=1),
+        )
+        record.delay('вторая')
+        self.assertEqual(queue.work(batch_size=2), 3)
+        self.assertEqual(calls, ['срочная', 'первая', 'вторая'])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 3)
+        self.assertEqual(
+            json.loads(Job.objects.get(status=Job.QUEUED).payload),
+            {'args': ['отложенная'], 'kwargs': {}},
+        )
+
+    def test_retry_then_fail(self):
+        """Проверка: упавшая задача повторяется, затем помечается ошибкой."""
+        job = explode.delay()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Сбой задачи', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_visibility_timeout(self):
+        """Проверка: задачу упавшего исполнителя возьмёт другой."""
+        job = record.delay('после сбоя')
+        token, claimed = queue.claim('упавший', 10)
+        self.assertEqual(claimed, [job])
+        # Пока задача видима только первому, второй её не получает
+        self.assertEqual(queue.claim('второй', 10)[1], [])
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(queue.work('второй'), 1)
+        # Опоздавший первый исполнитель итог не перезапишет
+        self.assertFalse(queue.run(claimed[0], token))
+        self.assertEqual(calls, ['после сбоя'])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    def test_stop_releases_batch(self):
+        """Проверка: при остановке не начатые задачи пачки возвращаются."""
+        request_stop.delay()
+        record.delay('после остановки')
+        worker_loop(stop, batch_size=10)
+        self.assertEqual(calls, [])
+        job = Job.objects.get(task=record.name)
+        self.assertEqual(
+            (job.status, job.attempts, job.locked_by),
+            (Job.QUEUED, 0, ''),
+        )
+        self.assertEqual(queue.work(), 1)
+        self.assertEqual(calls, ['после остановки'])
+
+    def test_stats(self):
+        """Проверка: метрики показывают глубину очереди и задержки."""
+        record.delay(1)
+        record.delay(2)
+        queue.work(limit=1)
+        result = queue.stats()
+        self.assertEqual(result['ready'], 1)
+        self.assertEqual(result['ready_by_task'], {record.name: 1})
+        self.assertEqual(result['done_in_window'], 1)
+        self.assertIsNotNone(result['wait']['p95_ms'])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager(self):
+        """Проверка: с JOBS_EAGER задача выполняется сразу."""
+        self.assertIsNone(record.delay('сразу'))
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,89 @@
+"""
+Процессы-исполнители фоновых задач.
+
+`run_pool()` запускает `processes` дочерних процессов; каждый в цикле
+забирает пачку задач (jobs/queue.py), выполняет их и, если очередь
+пуста, ждёт JOBS_POLL_INTERVAL. Главный процесс перезапускает упавших
+исполнителей и по SIGINT/SIGTERM просит всех закончить текущую
+задачу и выйти. Раз в JOBS_PURGE_INTERVAL первый исполнитель удаляет
+старые выполненные задачи.
+"""
+import logging
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import queue
+
+
+logger = logging.getLogger(__name__)
+
+
+def worker_loop(stop, batch_size=None, poll_interval=None, purge=False):
+    """Цикл исполнителя до установки события `stop`."""
+    batch_size = batch_size or settings.JOBS_BATCH_SIZE
+    poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+    name = queue.worker_name()
+    purged = time.monotonic()
+    while not stop.is_set():
+        close_old_connections()
+        token, jobs = queue.claim(name, batch_size)
+        for number, job in enumerate(jobs, 1):
+            queue.run(job, token)
+            close_old_connections()
+            if stop.is_set():
+                # Не начатые задачи пачки сразу возвращаются в очередь
+                queue.release(jobs[number:], token)
+                break
+        if purge and time.monotonic() - purged > settings.JOBS_PURGE_INTERVAL:
+            queue.purge()
+            purged = time.monotonic()
+        if not jobs:
+            stop.wait(poll_interval)
+    connections.close_all()
+
+
+def _child(stop, batch_size, poll_interval, purge):
+    # Сигналы обрабатывает главный процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    worker_loop(stop, batch_size, poll_interval, purge)
+
+
+def run_pool(processes, batch_size=None, poll_interval=None):
+    # Соединения с базой не должны переходить в дочерние процессы
+    connections.close_all()
+    stop = multiprocessing.Event()
+
+    def request_stop(signum, frame):
+        logger.info('Остановка исполнителей')
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    def start(index):
+        process = multiprocessing.Process(
+            target=_child,
+            args=(stop, batch_size, poll_interval, index == 0),
+            name=f'jobs-worker-{index}',
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    pool = [start(index) for index in range(processes)]
+    while not stop.is_set():
+        for index, process in enumerate(pool):
+            if not process.is_alive():
+                logger.warning(
+                    'Исполнитель %s завершился с кодом %s, перезапуск',
+                    process.name, process.exitcode,
+                )
+                pool[index] = start(index)
+        stop.wait(1)
+    for process in pool:
+        process.join()
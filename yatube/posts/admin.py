@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Post, Group
+from .search import get_backend as search_backend
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -16,6 +17,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице - полнотекстовый индекс
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return search_backend().filter(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,226 @@
+"""
+JSON API только для чтения: ленты, пост с комментариями, подписки.
+
+Посты выбираются через `values()` без создания моделей, страницы ленты
+- по курсору (см. CursorPaginator), ответ кодируется в JSON по одной
+записи и отдаётся потоком, при поддержке клиентом - сжатым gzip. Как
+и HTML-страницы, ответы несут ETag из поколений кеша лент.
+"""
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import urlencode
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from . import cache as feed_cache
+from . import timeline
+from .cache import conditional_feed
+from .models import Comment, Group, Post, User
+from .paginators import CursorPaginator
+from .views import post_detail_scopes, viewer_scopes
+
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+POST_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'author__username',
+    'group__slug',
+    'image',
+    'thumbnail',
+    'comments_count',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """CursorPaginator по словарям из `values()`."""
+
+    # Окно в одну страницу: нужно знать только, есть ли следующая
+    def __init__(self, object_list, per_page, pk_field='id'):
+        super().__init__(object_list, per_page, window=1)
+        self.pk_field = pk_field
+
+    def key(self, row):
+        return row[self.date_field], row[self.pk_field]
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        return API_PAGE_SIZE
+    return min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+
+def serialize_post(row, prefix=''):
+    image = row[f'{prefix}image']
+    return {
+        'id': row[f'{prefix}id'],
+        'text': row[f'{prefix}text'],
+        'pub_date': row[f'{prefix}pub_date'],
+        'author': row[f'{prefix}author__username'],
+        'group': row[f'{prefix}group__slug'],
+        'image': default_storage.url(image) if image else None,
+        'thumbnail': row[f'{prefix}thumbnail'] or None,
+        'comments_count': row[f'{prefix}comments_count'],
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def stream_json(results, **fields):
+    """Кодирует {"results": [...], **fields} по частям."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '{"results": ['
+    for number, item in enumerate(results):
+        yield (', ' if number else '') + encoder.encode(item)
+    yield ']'
+    for name, value in fields.items():
+        yield f', {encoder.encode(name)}: {encoder.encode(value)}'
+    yield '}'
+
+
+def json_stream_response(results, **fields):
+    return StreamingHttpResponse(
+        stream_json(results, **fields), content_type='application/json'
+    )
+
+
+def page_url(request, query, limit):
+    return f'{request.path}?{query}&{urlencode({"limit": limit})}'
+
+
+def feed_response(request, rows, pk_field='id', prefix=''):
+    limit = get_limit(request)
+    paginator = ValuesCursorPaginator(rows, limit, pk_field)
+    page = paginator.get_page(
+        request.GET.get('page'), request.GET.get('cursor')
+    )
+    return json_stream_response(
+        (serialize_post(row, prefix) for row in page),
+        next=(
+            page_url(request, paginator.next_query, limit)
+            if page.has_next() else None
+        ),
+        previous=(
+            page_url(request, paginator.previous_query, limit)
+            if page.has_previous() else None
+        ),
+    )
+
+
+def not_found(detail):
+    return JsonResponse({'detail': detail}, status=404)
+
+
+def api_login_required(view_func):
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Требуется авторизация'}, status=401
+            )
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+@require_safe
+@gzip_page
+@conditional_feed(
+    'api_index',
+    lambda request: [feed_cache.GLOBAL, feed_cache.GROUPS],
+)
+def post_list(request):
+    return feed_response(request, Post.objects.values(*POST_FIELDS))
+
+
+@require_safe
+@gzip_page
+@conditional_feed(
+    'api_group',
+    lambda request, slug: [feed_cache.group_scope(slug)],
+)
+def group_post_list(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return not_found('Группа не найдена')
+    return feed_response(request, group.posts.values(*POST_FIELDS))
+
+
+@require_safe
+@gzip_page
+@conditional_feed(
+    'api_profile',
+    lambda request, username: [
+        feed_cache.author_scope(username),
+        feed_cache.GROUPS,
+    ],
+)
+def profile_post_list(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return not_found('Пользователь не найден')
+    return feed_response(request, author.posts.values(*POST_FIELDS))
+
+
+@require_safe
+@gzip_page
+@api_login_required
+@conditional_feed(
+    'api_follow',
+    lambda request: [
+        feed_cache.GLOBAL,
+        feed_cache.GROUPS,
+        *viewer_scopes(request),
+    ],
+)
+def follow_post_list(request):
+    rows, pk_field, prefix = timeline.follow_feed_values(
+        request.user, POST_FIELDS
+    )
+    return feed_response(request, rows, pk_field, prefix)
+
+
+@require_safe
+@gzip_page
+@conditional_feed('api_post_detail', post_detail_scopes)
+def post_detail(request, post_id):
+    post = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+    if post is None:
+        return not_found('Пост не найден')
+    # Комментарии идут по возрастанию id, продолжение - после `after`
+    limit = get_limit(request)
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        after = 0
+    comments = list(
+        Comment.objects.filter(post_id=post_id, id__gt=after).order_by(
+            'id'
+        ).values(*COMMENT_FIELDS)[:limit + 1]
+    )
+    next_url = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_url = f'{request.path}?' + urlencode(
+            {'after': comments[-1]['id'], 'limit': limit}
+        )
+    return json_stream_response(
+        map(serialize_comment, comments),
+        post=serialize_post(post),
+        next=next_url,
+    )
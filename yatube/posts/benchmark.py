@@ -0,0 +1,385 @@
+"""
+Нагрузочный стенд для страниц `posts`.
+
+`seed()` заполняет базу синтетическими пользователями, группами,
+подписками, постами и комментариями (тексты - Faker), `run()` обходит
+страницы тестовым клиентом и для каждой собирает число SQL-запросов,
+p50/p95 времени ответа и пик памяти, `compare()` сверяет результат с
+сохранённым эталоном. Используется командами `seed_posts` и
+`benchmark_views` и тестами с маркером `benchmark`.
+
+`run_concurrent()` меряет базу, а не страницы: сколько чтений ленты в
+секунду выдерживает SQLite, пока параллельно пишутся комментарии, для
+стандартного профиля соединения Django и профиля из DATABASES
+(команда `benchmark_sqlite`).
+"""
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (
+    OperationalError, connection, connections, transaction,
+)
+from django.db.models import F, Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from core.sqlite.utils import snapshot
+from . import counters, timeline
+from .bulk import batches, bulk_create_dated
+from .search import get_backend as search_backend
+from .models import Comment, Follow, Group, Post, User
+
+
+TEXTS_POOL_SIZE = 500
+CONCURRENT_FEED_SIZE = 10
+
+
+def seed(posts, users=100, groups=10, follows=20, comments=1,
+         batch_size=5000, random_seed=0, log=None):
+    """
+    Создаёт `posts` постов от `users` авторов в `groups` группах;
+    каждый пользователь подписан на `follows` авторов, у каждого поста
+    `comments` комментариев.
+    """
+    log = log or (lambda message: None)
+    rnd = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    texts = [fake.paragraph(nb_sentences=3) for _ in range(TEXTS_POOL_SIZE)]
+    token = uuid.uuid4().hex[:8]
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            User(
+                username=f'bench_{token}_{i}',
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+            ) for i in range(users)
+        )
+        user_ids = list(User.objects.filter(
+            username__startswith=f'bench_{token}_'
+        ).values_list('pk', flat=True))
+        Group.objects.bulk_create(
+            Group(
+                title=fake.sentence(nb_words=3),
+                slug=f'bench-{token}-{i}',
+                description=fake.sentence(),
+            ) for i in range(groups)
+        )
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'bench-{token}-'
+        ).values_list('pk', flat=True))
+        log(f'Пользователей: {users}, групп: {groups}')
+
+        for batch in batches(
+            (
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id in user_ids
+                for author_id in rnd.sample(
+                    user_ids, min(follows + 1, len(user_ids))
+                )
+                if author_id != user_id
+            ),
+            batch_size,
+        ):
+            Follow.objects.bulk_create(batch)
+        log('Подписки созданы')
+
+        # Посты равномерно распределены по последнему году
+        now = timezone.now()
+        step = timedelta(days=365) / max(posts, 1)
+        group_choices = group_ids + [None]
+        created = 0
+        for batch in batches(
+            (
+                Post(
+                    text=rnd.choice(texts),
+                    author_id=rnd.choice(user_ids),
+                    group_id=rnd.choice(group_choices),
+                    pub_date=now - step * (posts - i),
+                ) for i in range(posts)
+            ),
+            batch_size,
+        ):
+            bulk_create_dated(Post, batch, ['pub_date'])
+            created += len(batch)
+            log(f'Постов: {created}')
+
+        # id постов берутся из базы окнами по batch_size: в диапазоне
+        # могут быть пропуски и чужие посты
+        seeded = Post.objects.filter(author_id__in=user_ids)
+        bounds = seeded.aggregate(first=Min('pk'), last=Max('pk'))
+        windows = range(
+            bounds['first'] or 0,
+            (bounds['last'] or -1) + 1,
+            batch_size,
+        )
+        for batch in batches(
+            (
+                Comment(
+                    post_id=post_id,
+                    author_id=rnd.choice(user_ids),
+                    text=rnd.choice(texts),
+                )
+                for start in windows
+                for post_id in seeded.filter(
+                    pk__gte=start, pk__lt=start + batch_size
+                ).values_list('pk', flat=True)
+                for _ in range(comments)
+            ),
+            batch_size,
+        ):
+            Comment.objects.bulk_create(batch)
+        log('Комментарии созданы')
+
+    # bulk_create обходит сигналы: счётчики и ленты считаются отдельно
+    counters.recount_comments(Post.objects.filter(author_id__in=user_ids))
+    counters.reconcile()
+    timeline.backfill_authors(user_ids)
+    search_backend().rebuild()
+    log('Счётчики, ленты подписок и поисковый индекс пересчитаны')
+    return user_ids
+
+
+def _view_urls(reader):
+    group = Group.objects.filter(posts__isnull=False).first()
+    post = Post.objects.order_by('-pub_date').first()
+    author = post.author if post else reader
+    return {
+        'posts:index': reverse('posts:index'),
+        'posts:group_list': (
+            reverse('posts:group_list', kwargs={'slug': group.slug})
+            if group else None
+        ),
+        'posts:profile': reverse(
+            'posts:profile', kwargs={'username': author.username}
+        ),
+        'posts:post_detail': (
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+            if post else None
+        ),
+        'posts:follow_index': reverse('posts:follow_index'),
+    }
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = max(0, round(len(values) * percent / 100) - 1)
+    return values[index]
+
+
+def run(reader, repeat=20, warm=False, pages=(1, 5)):
+    """
+    Измеряет страницы от лица пользователя `reader`.
+
+    Без `warm` кеш очищается перед каждым запросом, то есть меряется
+    полная отрисовка. Для лент проверяются страницы из `pages`.
+    """
+    client = Client()
+    client.force_login(reader)
+    results = {}
+    for name, url in _view_urls(reader).items():
+        if url is None:
+            continue
+        numbers = pages if name != 'posts:post_detail' else (1,)
+        for number in numbers:
+            page_url = url if number == 1 else f'{url}?page={number}'
+            key = name if number == 1 else f'{name}?page={number}'
+            results[key] = _measure(client, page_url, repeat, warm)
+    return results
+
+
+def _measure(client, url, repeat, warm):
+    timings = []
+    for _ in range(repeat):
+        if not warm:
+            cache.clear()
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: статус {response.status_code}')
+    # tracemalloc замедляет запрос в разы, поэтому память и запросы
+    # считаются отдельным прогоном
+    if not warm:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as captured:
+            client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'queries': len(captured),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Список регрессий относительно эталона: рост числа запросов или
+    p95 больше чем на `tolerance` (доля).
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        if actual['queries'] > expected['queries']:
+            regressions.append(
+                f'{name}: запросов {actual["queries"]} '
+                f'вместо {expected["queries"]}'
+            )
+        limit = expected.get('p95_ms')
+        if limit is not None and actual['p95_ms'] > limit * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {actual["p95_ms"]} мс при эталоне {limit} мс'
+            )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def connection_profiles():
+    """Стандартный бэкенд SQLite и профиль основной базы из DATABASES."""
+    tuned = settings.DATABASES['default']
+    return {
+        'django': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+        'tuned': {
+            'ENGINE': tuned['ENGINE'],
+            'OPTIONS': dict(tuned.get('OPTIONS', {})),
+        },
+    }
+
+
+def run_concurrent(duration=5.0, readers=4, writers=2, write_rate=100,
+                   profiles=None, random_seed=0):
+    """
+    Для каждого профиля соединения `duration` секунд читает первую
+    страницу ленты в `readers` потоках, пока `writers` потоков пишут
+    комментарий и счётчик поста в одной транзакции - всего не больше
+    `write_rate` записей в секунду (0 - без ограничения), чтобы профили
+    сравнивались при одной нагрузке записи. Каждый профиль работает со
+    своей копией основной базы, сама она не меняется.
+    """
+    profiles = profiles or connection_profiles()
+    post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+    author_ids = list(User.objects.values_list('pk', flat=True)[:1000])
+    if not post_ids:
+        raise ValueError('В базе нет постов: сначала выполните seed_posts')
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, profile in profiles.items():
+            alias = f'benchmark_{name}'
+            path = os.path.join(directory, f'{name}.sqlite3')
+            snapshot(connection, path)
+            connections.databases[alias] = {**profile, 'NAME': path}
+            try:
+                results[name] = _run_profile(
+                    alias, duration, readers, writers, write_rate,
+                    post_ids, author_ids, random_seed,
+                )
+            finally:
+                del connections.databases[alias]
+    return results
+
+
+def _run_profile(alias, duration, readers, writers, write_rate, post_ids,
+                 author_ids, random_seed):
+    deadline = time.perf_counter() + duration
+    pause = writers / write_rate if write_rate else 0
+    with ThreadPoolExecutor(max_workers=readers + writers) as executor:
+        reads = [
+            executor.submit(_read_loop, alias, deadline)
+            for _ in range(readers)
+        ]
+        writes = [
+            executor.submit(
+                _write_loop, alias, deadline, pause, post_ids, author_ids,
+                random.Random(random_seed + i),
+            )
+            for i in range(writers)
+        ]
+        reads = [future.result() for future in reads]
+        writes = [future.result() for future in writes]
+    timings = [timing for done, _ in reads for timing in done]
+    return {
+        'reads_per_s': round(len(timings) / duration, 1),
+        'read_p50_ms': round(statistics.median(timings), 2)
+        if timings else None,
+        'read_p95_ms': round(_percentile(timings, 95), 2)
+        if timings else None,
+        'writes_per_s': round(sum(done for done, _ in writes) / duration, 1),
+        'locked': sum(errors for _, errors in reads + writes),
+    }
+
+
+def _read_loop(alias, deadline):
+    timings, errors = [], 0
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                list(Post.objects.using(alias).for_feed()[
+                    :CONCURRENT_FEED_SIZE
+                ])
+            except OperationalError:
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connections[alias].close()
+    return timings, errors
+
+
+def _write_loop(alias, deadline, pause, post_ids, author_ids, rnd):
+    done, errors = 0, 0
+    next_write = time.perf_counter()
+    try:
+        while time.perf_counter() < deadline:
+            # Записи идут с заданной частотой, а не с максимальной
+            time.sleep(max(0, next_write - time.perf_counter()))
+            next_write += pause
+            post_id = rnd.choice(post_ids)
+            try:
+                # Как add_comment: комментарий и счётчик в одной транзакции
+                with transaction.atomic(using=alias):
+                    Comment.objects.using(alias).bulk_create([Comment(
+                        post_id=post_id,
+                        author_id=rnd.choice(author_ids),
+                        text='Комментарий под нагрузкой',
+                    )])
+                    Post.objects.using(alias).filter(pk=post_id).update(
+                        comments_count=F('comments_count') + 1
+                    )
+            except OperationalError:
+                errors += 1
+                continue
+            done += 1
+    finally:
+        connections[alias].close()
+    return done, errors
@@ -0,0 +1,164 @@
+"""
+Картинки постов без дублей.
+
+Загруженный файл хешируется ещё при приёме (core/uploads.py). Если
+картинка с таким хешем уже есть в таблице ImageBlob, пост просто
+ссылается на её файл: без декодирования, без новой миниатюры и без
+новых уменьшенных копий. Иначе картинка обрабатывается
+(posts/images.py) и сохраняется под именем по хешу результата.
+
+Число постов с картинкой (`refcount`) меняют сигналы сохранения и
+удаления поста. Картинки без ссылок не удаляются сразу: загрузка
+той же картинки могла начаться раньше, чем пост с ней удалили.
+Их вместе с миниатюрами и копиями удаляет `collect()` (команда
+`manage.py collect_images`) спустя некоторое время. Повторная загрузка
+отсчитывает это время заново, поэтому картинку не удалят, пока
+сохраняется пост с ней.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import images
+from .models import ImageBlob, Post
+
+
+# Сколько ждать, прежде чем удалить картинку без ссылок
+COLLECT_GRACE = timedelta(hours=1)
+
+
+def upload_hash(uploaded_file):
+    """sha256 загрузки: посчитанный при приёме или по содержимому."""
+    digest = getattr(uploaded_file, 'content_hash', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
+
+
+def _reuse(blob):
+    # Картинку без ссылок collect() удаляет по времени освобождения:
+    # отметка откладывает удаление, пока пост с ней не сохранён. Если
+    # collect() успел удалить запись, картинка загружается заново.
+    if blob is None:
+        return None
+    touched = ImageBlob.objects.filter(pk=blob.pk).update(
+        released=timezone.now()
+    )
+    return blob if touched else None
+
+
+def store_upload(uploaded_file):
+    """
+    ImageBlob для загруженной картинки: уже известный или новый.
+    Ошибки проверки картинки - images.ImageRejected.
+    """
+    source_hash = upload_hash(uploaded_file)
+    blob = _reuse(ImageBlob.objects.filter(source_hash=source_hash).first())
+    if blob is not None:
+        return blob
+    processed = images.process_upload(uploaded_file)
+    name = Post._meta.get_field('image').generate_filename(
+        None, processed.name
+    )
+    blob = _reuse(ImageBlob.objects.filter(name=name).first())
+    if blob is not None:
+        # Другой файл дал ту же картинку после обработки
+        return blob
+    saved = default_storage.save(name, processed)
+    if saved != name:
+        # Файл уже сохранила параллельная загрузка: содержимое то же
+        default_storage.delete(saved)
+    try:
+        with transaction.atomic():
+            return ImageBlob.objects.create(
+                name=name,
+                source_hash=source_hash,
+                width=processed.width,
+                height=processed.height,
+            )
+    except IntegrityError:
+        return ImageBlob.objects.get(name=name)
+
+
+def acquire(name):
+    """Ещё один пост ссылается на картинку `name`."""
+    if not name:
+        return
+    updated = ImageBlob.objects.filter(name=name).update(
+        refcount=F('refcount') + 1
+    )
+    if not updated:
+        # Картинка сохранена в обход store_upload (импорт, админка)
+        ImageBlob.objects.get_or_create(
+            name=name, defaults={'refcount': 1}
+        )
+
+
+def release(name):
+    """Пост больше не ссылается на картинку `name`."""
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1, released=timezone.now()
+    )
+
+
+def reconcile():
+    """
+    Пересчитывает ссылки по постам (после записи в обход сигналов);
+    возвращает число исправленных картинок.
+    """
+    known = ImageBlob.objects.values('name')
+    missing = Post.objects.exclude(image='').exclude(
+        image__in=known
+    ).values_list('image', flat=True).distinct()
+    ImageBlob.objects.bulk_create(
+        (ImageBlob(name=name) for name in missing.iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    counts = Post.objects.filter(image=OuterRef('name')).order_by().values(
+        'image'
+    ).annotate(total=Count('pk')).values('total')
+    return ImageBlob.objects.annotate(
+        actual=Coalesce(Subquery(counts), 0)
+    ).exclude(refcount=F('actual')).update(
+        refcount=Coalesce(Subquery(counts), 0), released=timezone.now()
+    )
+
+
+def collect(grace=COLLECT_GRACE):
+    """
+    Удаляет картинки без ссылок, освобождённые раньше, чем `grace`
+    назад, вместе с миниатюрами и уменьшенными копиями. Возвращает
+    число удалённых картинок.
+    """
+    cutoff = timezone.now() - grace
+    unused = ImageBlob.objects.filter(refcount=0).filter(
+        Q(released__lt=cutoff) | Q(released__isnull=True, created__lt=cutoff)
+    )
+    removed = 0
+    for blob in unused.iterator():
+        if Post.objects.filter(image=blob.name).exists():
+            # Ссылки записаны в обход сигналов: поправит reconcile()
+            continue
+        # Картинку могли снова взять или загрузить после выборки: условия
+        # проверяются ещё раз в самом DELETE
+        deleted, _ = unused.filter(pk=blob.pk).delete()
+        if not deleted:
+            continue
+        for width in images.variant_widths(blob.width):
+            default_storage.delete(images.variant_name(blob.name, width))
+        delete_thumbnails(blob.name)
+        removed += 1
+    return removed
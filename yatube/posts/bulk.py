@@ -0,0 +1,59 @@
+"""Вспомогательные функции для массовой записи через bulk_create."""
+from django.db.models import Max
+
+
+class UnmatchedPks(Exception):
+    pass
+
+
+def bulk_create_dated(model, objs, date_fields, batch_size=None):
+    """
+    bulk_create, который сохраняет заданные значения полей с
+    auto_now_add (`date_fields` - имена полей).
+
+    При вставке такие поля получают текущее время, поэтому заданные
+    значения записываются вторым запросом через bulk_update. Для него
+    нужны id новых строк; на базах без RETURNING (SQLite) они идут
+    подряд после последнего id, если в таблицу в этой транзакции
+    больше никто не пишет. Иначе - UnmatchedPks.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    dates = [
+        {name: getattr(obj, name) for name in date_fields} for obj in objs
+    ]
+    last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    model.objects.bulk_create(objs, batch_size=batch_size)
+    if objs[0].pk is None:
+        pks = list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+        if len(pks) != len(objs):
+            raise UnmatchedPks(
+                'Не удалось сопоставить id новых строк: во время записи '
+                'в таблицу писали другие процессы'
+            )
+        for obj, pk in zip(objs, pks):
+            obj.pk = pk
+    for name in date_fields:
+        restored = []
+        for obj, values in zip(objs, dates):
+            if values[name] is not None:
+                setattr(obj, name, values[name])
+                restored.append(obj)
+        model.objects.bulk_update(restored, [name], batch_size=batch_size)
+    return objs
+
+
+def batches(objects, batch_size):
+    # Ограничивает число объектов в памяти; на INSERT допустимого для
+    # базы размера bulk_create делит пачку сам
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
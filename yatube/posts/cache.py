@@ -0,0 +1,239 @@
+"""
+Кеширование лент с инвалидацией по событиям.
+
+Каждая лента зависит от нескольких «областей» (scope): вся лента сайта,
+группа, автор, подписки пользователя. У области есть счётчик поколений в
+кеше; сигналы моделей увеличивают его, и ключи страниц, построенные на
+старом значении, больше не используются. Поэтому время жизни страниц в
+кеше можно держать большим: изменения видны сразу после записи.
+
+Те же поколения служат ETag страниц: если ни одна область не
+изменилась, клиент получает 304 без выборки постов и отрисовки.
+"""
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.utils.safestring import mark_safe
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core.replicas import staleness_tag
+from .models import Post
+
+
+GENERATION_KEY_PREFIX = 'feed_gen'
+CARD_KEY_PREFIX = 'post_card'
+POST_AUTHOR_KEY_PREFIX = 'post_author_id'
+CARD_TEMPLATE = 'includes/publication.html'
+# Сколько первых карточек страницы видно без прокрутки
+EAGER_CARDS = 1
+
+# Области, от которых зависят ленты
+GLOBAL = ('global',)
+GROUPS = ('groups',)
+
+
+def group_scope(slug):
+    return ('group', slug)
+
+
+def author_scope(username):
+    return ('author', username)
+
+
+def author_id_scope(user_id):
+    # Автор по id: для страниц, где имя автора неизвестно без запроса
+    return ('author_id', user_id)
+
+
+def follower_scope(user_id):
+    return ('follower', user_id)
+
+
+def post_scope(post_id):
+    return ('post', post_id)
+
+
+def generation_key(scope):
+    # Слаги и имена пользователей могут содержать любые символы,
+    # поэтому в ключ попадает их хеш.
+    digest = md5(':'.join(map(str, scope)).encode()).hexdigest()
+    return f'{GENERATION_KEY_PREFIX}:{digest}'
+
+
+def _initial_generation():
+    # Значение, зависящее от времени, чтобы после вытеснения счётчика
+    # из кеша не вернуться к поколению, для которого ещё лежат страницы.
+    return time.time_ns() // 1000
+
+
+def feed_version(*scopes):
+    """Строка из текущих поколений областей для ключа кеша."""
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _initial_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return '.'.join(str(generations[key]) for key in keys)
+
+
+def bump(*scopes):
+    """
+    Сбрасывает кеш всех страниц, зависящих от областей `scopes`.
+
+    Внутри транзакции поколения меняются ещё раз после фиксации:
+    читатель, который успел взять новое поколение, но читал базу до
+    фиксации, кеширует старую страницу под ключом, который больше не
+    используется.
+    """
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), timeout=None)
+
+
+def _viewer_etag(request, key_prefix, version):
+    # Страницы отличаются для разных пользователей (шапка, кнопки),
+    # поэтому валидатор включает id пользователя
+    viewer = request.user.pk if request.user.is_authenticated else 0
+    # Страница из реплики может отставать от поколений областей
+    stale = staleness_tag(request)
+    return md5(
+        f'{key_prefix}:{version}:{viewer}:{stale}'.encode()
+    ).hexdigest()
+
+
+def _revalidate(request, response):
+    # cache_page ставит max-age на время жизни кеша; браузер должен
+    # каждый раз переспрашивать страницу по ETag
+    if 'Expires' in response:
+        del response['Expires']
+    patch_cache_control(
+        response,
+        max_age=0,
+        no_cache=True,
+        private=request.user.is_authenticated,
+    )
+    return response
+
+
+def conditional_feed(key_prefix, scopes, cache_timeout=None):
+    """
+    Отвечает 304 Not Modified, если не изменилась ни одна из областей
+    `scopes(request, *args, **kwargs)` и пользователь тот же. Если
+    `scopes` вернул None (например, объекта нет), проверка пропускается.
+
+    С `cache_timeout` страница ещё и кешируется, как `cache_page`, но
+    с префиксом ключа, включающим поколения областей.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            page_scopes = scopes(request, *args, **kwargs)
+            if page_scopes is None:
+                return view_func(request, *args, **kwargs)
+            version = feed_version(*page_scopes)
+            # Вьюха может строить по поколениям свои ключи кеша
+            request.feed_version = version
+            view = view_func
+            if cache_timeout is not None:
+                view = cache_page(
+                    cache_timeout, key_prefix=f'{key_prefix}:{version}'
+                )(view)
+            etag = _viewer_etag(request, key_prefix, version)
+            view = condition(etag_func=lambda *args, **kwargs: etag)(view)
+            return _revalidate(request, view(request, *args, **kwargs))
+        return _wrapped_view
+    return decorator
+
+
+def cache_feed(key_prefix, scopes):
+    """Кешируемая лента с проверкой ETag, см. `conditional_feed`."""
+    return conditional_feed(
+        key_prefix, scopes, cache_timeout=settings.FEED_CACHE_TIMEOUT
+    )
+
+
+def post_author(post_id):
+    """
+    id автора поста. Автора у поста не меняют, а id, в отличие от имени,
+    не меняется при переименовании, поэтому кешируется без срока.
+    """
+    key = f'{POST_AUTHOR_KEY_PREFIX}:{post_id}'
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is not None:
+            cache.set(key, author_id, timeout=None)
+    return author_id
+
+
+def author_version(author):
+    """Хеш данных автора, которые показывает карточка поста."""
+    return md5(
+        f'{author.username}:{author.get_full_name()}'.encode()
+    ).hexdigest()[:8]
+
+
+def card_key(post, loading='lazy', following=None):
+    """
+    Ключ карточки поста: меняется при каждом сохранении поста и при
+    смене имени автора.
+    """
+    return (
+        f'{CARD_KEY_PREFIX}:{post.pk}:{post.updated.timestamp()}'
+        f':{author_version(post.author)}:{loading}:{following}'
+    )
+
+
+def render_cards(posts, eager=EAGER_CARDS, following=None):
+    """
+    Карточки постов ленты (`includes/publication.html`): [(пост, html)].
+
+    Готовые карточки берутся из кеша одним запросом, отрисовываются
+    только недостающие, и они же одним запросом кладутся в кеш.
+    Картинки первых `eager` карточек загружаются сразу, остальных -
+    по мере прокрутки (loading="lazy"). `following` - состояния
+    подписки на авторов (posts/viewer.py) для кнопки в карточке.
+    Карточка кешируется отдельно для каждого сочетания этих значений.
+    """
+    posts = list(posts)
+    following = following or {}
+    contexts = [
+        {
+            'post': post,
+            'loading': 'eager' if position < eager else 'lazy',
+            'following': following.get(post.author_id),
+        }
+        for position, post in enumerate(posts)
+    ]
+    keys = [
+        card_key(post, context['loading'], context['following'])
+        for post, context in zip(posts, contexts)
+    ]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, context in zip(keys, contexts):
+        if key not in cards:
+            missing[key] = render_to_string(CARD_TEMPLATE, context)
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [(post, mark_safe(cards[key])) for post, key in zip(posts, keys)]
@@ -0,0 +1,99 @@
+"""
+Денормализованные счётчики: число постов автора, подписчиков и подписок
+пользователя (UserCounters) и число комментариев поста
+(Post.comments_count).
+
+Счётчики меняются сигналами моделей в той же транзакции, что и сама
+запись, через UPDATE ... SET x = x + 1. Расхождения (например, после
+bulk_create или правки базы вручную) исправляет `reconcile()`,
+см. команду `manage.py reconcile_counters`.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _shifted(field, delta):
+    # После расхождения (удаление в обход сигналов) уменьшение могло бы
+    # увести счётчик ниже нуля; поле PositiveIntegerField проверяется
+    # ограничением CHECK, и UPDATE уронил бы удаление, которое его вызвало
+    return Greatest(F(field) + delta, 0)
+
+
+def change_user_counter(user_id, field, delta):
+    updated = UserCounters.objects.filter(user_id=user_id).update(
+        **{field: _shifted(field, delta)}
+    )
+    if not updated and delta > 0:
+        # Строки ещё нет: считаем значение заново. При уменьшении
+        # строку не создаём: пользователь может удаляться каскадом.
+        UserCounters.objects.get_or_create(
+            user_id=user_id, defaults=count_user(user_id)
+        )
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shifted('comments_count', delta)
+    )
+
+
+def recount_comments(posts):
+    """Пересчитывает comments_count постов одним UPDATE."""
+    return posts.update(comments_count=_count_subquery(Comment, 'post'))
+
+
+def count_user(user_id):
+    return {
+        field: model.objects.filter(**{lookup: user_id}).count()
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }
+
+
+def _count_subquery(model, lookup, outer_field='pk'):
+    counts = model.objects.filter(
+        **{lookup: OuterRef(outer_field)}
+    ).order_by().values(lookup).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcile():
+    """Пересчитывает все счётчики; возвращает число исправленных строк."""
+    fixed = 0
+    users = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True
+    )
+    for user_id in users.iterator():
+        UserCounters.objects.get_or_create(
+            user_id=user_id, defaults=count_user(user_id)
+        )
+        fixed += 1
+
+    drifted = UserCounters.objects.annotate(**{
+        f'actual_{field}': _count_subquery(model, lookup, 'user_id')
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }).exclude(**{
+        field: F(f'actual_{field}') for field in USER_COUNTERS
+    })
+    for counters in drifted.iterator():
+        UserCounters.objects.filter(pk=counters.pk).update(**{
+            field: getattr(counters, f'actual_{field}')
+            for field in USER_COUNTERS
+        })
+        fixed += 1
+
+    posts = Post.objects.annotate(
+        actual=_count_subquery(Comment, 'post')
+    ).exclude(comments_count=F('actual')).values_list('pk', 'actual')
+    for post_id, actual in posts.iterator():
+        Post.objects.filter(pk=post_id).update(comments_count=actual)
+        fixed += 1
+    return fixed
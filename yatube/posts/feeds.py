@@ -0,0 +1,223 @@
+"""
+RSS и Atom для ленты сайта, групп и авторов.
+
+Фид собирается генераторами `django.utils.feedgenerator`, но не в
+памяти целиком: корневые элементы и каждый пост отдаются потоком по
+мере чтения постов итератором запроса (автор и группа - через JOIN).
+Готовое тело ответа попутно собирается и кладётся в кеш с ключом по
+поколениям областей (см. posts/cache.py), а те же поколения служат
+ETag: частый опрос фида, который не менялся, обходится без запросов к
+базе - 304 или тело из кеша.
+"""
+import io
+from abc import ABC, abstractmethod
+from hashlib import md5
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+from django.views.decorators.http import require_safe
+
+from . import cache as feed_cache
+from .cache import conditional_feed
+from .models import Group, Post, User
+
+
+FEED_SIZE = 50
+FEED_TITLE_WORDS = 10
+SYNDICATION_KEY_PREFIX = 'syndication'
+
+
+class StreamingFeedMixin(ABC):
+    """
+    Запись фида по частям: заголовок, каждый пост, закрывающие теги.
+    Посты не накапливаются в `self.items`, а берутся из итератора.
+    """
+
+    item_tag = None
+    latest = None
+
+    def latest_post_date(self):
+        # Дата самого нового поста известна заранее
+        return self.latest or super().latest_post_date()
+
+    @abstractmethod
+    def write_head(self, handler):
+        """Открывающие теги и элементы фида до первого поста."""
+
+    @abstractmethod
+    def write_tail(self, handler):
+        """Закрывающие теги после последнего поста."""
+
+    def item(self, **kwargs):
+        """Словарь поста в формате `add_item()`."""
+        self.add_item(**kwargs)
+        return self.items.pop()
+
+    def stream(self, items, encoding='utf-8'):
+        buffer = io.StringIO()
+
+        def flush():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk.encode(encoding)
+
+        handler = SimplerXMLGenerator(buffer, encoding)
+        handler.startDocument()
+        self.write_head(handler)
+        yield flush()
+        for item in items:
+            handler.startElement(self.item_tag, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_tag)
+            yield flush()
+        self.write_tail(handler)
+        yield flush()
+
+
+class RssFeed(StreamingFeedMixin, feedgenerator.Rss201rev2Feed):
+    item_tag = 'item'
+
+    def write_head(self, handler):
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def write_tail(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+class AtomFeed(StreamingFeedMixin, feedgenerator.Atom1Feed):
+    item_tag = 'entry'
+
+    def write_head(self, handler):
+        handler.startElement('feed', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def write_tail(self, handler):
+        handler.endElement('feed')
+
+
+FEED_CLASSES = {'rss': RssFeed, 'atom': AtomFeed}
+
+
+def _cached_chunks(key, chunks):
+    """Отдаёт части дальше и, если поток дошёл до конца, кеширует тело."""
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(body), settings.FEED_CACHE_TIMEOUT)
+
+
+def feed_response(request, kind, describe):
+    """
+    Фид `kind` ('rss' или 'atom'): из кеша, если фид с теми же
+    поколениями областей уже отдавался, иначе потоком. `describe()`
+    возвращает заголовок, ссылку, описание и queryset постов фида;
+    при попадании в кеш он не вызывается.
+    """
+    feed_class = FEED_CLASSES.get(kind)
+    if feed_class is None:
+        raise Http404('Неизвестный формат фида')
+    # Ссылки в фиде абсолютные: тело зависит от схемы и хоста запроса
+    url = md5(request.build_absolute_uri(request.path).encode()).hexdigest()
+    key = f'{SYNDICATION_KEY_PREFIX}:{url}:{request.feed_version}'
+    body = cache.get(key)
+    if body is not None:
+        return HttpResponse(body, content_type=feed_class.content_type)
+
+    title, link, description, posts = describe()
+    feed = feed_class(
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        feed_url=request.build_absolute_uri(),
+        language='ru',
+    )
+    posts = posts.for_feed()[:FEED_SIZE].iterator()
+    # Дата обновления фида - дата первого (самого нового) поста
+    first = next(posts, None)
+    if first is not None:
+        feed.latest = first.pub_date
+        posts = chain([first], posts)
+    items = (_post_item(request, feed, post) for post in posts)
+    return StreamingHttpResponse(
+        _cached_chunks(key, feed.stream(items)),
+        content_type=feed_class.content_type,
+    )
+
+
+def _post_item(request, feed, post):
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', kwargs={'post_id': post.pk})
+    )
+    return feed.item(
+        title=Truncator(post.text).words(FEED_TITLE_WORDS),
+        link=link,
+        unique_id=link,
+        description=post.text,
+        author_name=post.author.get_full_name() or post.author.username,
+        pubdate=post.pub_date,
+        updateddate=post.updated,
+        categories=[post.group.title] if post.group_id else None,
+    )
+
+
+@require_safe
+@conditional_feed(
+    'index_feed',
+    lambda request, kind: [feed_cache.GLOBAL, feed_cache.GROUPS],
+)
+def index_feed(request, kind):
+    return feed_response(request, kind, lambda: (
+        'Yatube',
+        reverse('posts:index'),
+        'Последние обновления на сайте',
+        Post.objects.all(),
+    ))
+
+
+@require_safe
+@conditional_feed(
+    'group_feed',
+    lambda request, slug, kind: [feed_cache.group_scope(slug)],
+)
+def group_feed(request, slug, kind):
+    def describe():
+        group = get_object_or_404(Group, slug=slug)
+        return (
+            group.title,
+            reverse('posts:group_list', kwargs={'slug': slug}),
+            group.description,
+            group.posts.all(),
+        )
+    return feed_response(request, kind, describe)
+
+
+@require_safe
+@conditional_feed(
+    'profile_feed',
+    lambda request, username, kind: [
+        feed_cache.author_scope(username),
+        feed_cache.GROUPS,
+    ],
+)
+def profile_feed(request, username, kind):
+    def describe():
+        author = get_object_or_404(User, username=username)
+        return (
+            f'Посты пользователя {author.get_full_name() or username}',
+            reverse('posts:profile', kwargs={'username': username}),
+            '',
+            author.posts.all(),
+        )
+    return feed_response(request, kind, describe)
@@ -1,9 +1,60 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from core.uploads import too_large
+
+from . import blobs, images
 from .models import Post, Comment
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        upload = self.files.get('image') if self.files else None
+        if upload is not None and too_large(upload):
+            # Обрезанный при загрузке файл не откроется как картинка:
+            # объясняем настоящую причину
+            self.fields['image'].error_messages['invalid_image'] = (
+                images.size_error()
+            )
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            # Только заголовок: файл сохраняется после проверки всей формы
+            try:
+                images.inspect(image)
+            except images.ImageRejected as error:
+                raise forms.ValidationError(str(error))
+        return image
+
+    def store_image(self):
+        """
+        Сохраняет новую картинку проверенной формы и переносит её имя,
+        размеры и готовую миниатюру в пост. Возвращает False, если
+        картинку не удалось прочитать: ошибка добавляется в форму.
+        """
+        image = self.cleaned_data.get('image')
+        if not image:
+            # Картинку убрали (False) или её не было
+            self.instance.image_width = self.instance.image_height = None
+            self.instance.thumbnail = ''
+            return True
+        if not isinstance(image, UploadedFile):
+            # Картинка поста не менялась
+            return True
+        try:
+            blob = blobs.store_upload(image)
+        except images.ImageRejected as error:
+            self.add_error('image', str(error))
+            return False
+        # Пост получает имя уже сохранённого файла, а если для этой
+        # картинки есть миниатюра - то и её
+        self.instance.image = blob.name
+        self.instance.image_width = blob.width
+        self.instance.image_height = blob.height
+        self.instance.thumbnail = blob.thumbnail
+        return True
 
     class Meta:
         model = Post
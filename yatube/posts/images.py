@@ -0,0 +1,206 @@
+"""
+Обработка картинок постов.
+
+При загрузке (`process_upload`) картинка проверяется по заголовку, без
+декодирования пикселей: формат и размеры. Затем она один раз
+декодируется: поворачивается по EXIF, уменьшается до
+POST_IMAGE_MAX_SIDE (JPEG сразу декодируется в уменьшенном масштабе)
+и сохраняется заново без метаданных. Имя файла - хеш содержимого,
+поэтому файл под этим именем никогда не меняется и может отдаваться
+с бессрочным кешированием.
+
+Уменьшенные копии для разных ширин экрана (`make_variants`) создаются
+в фоне вместе с миниатюрой (см. posts/thumbnails.py) в первом формате
+из POST_IMAGE_VARIANT_FORMATS, который поддерживает Pillow. Их имена
+выводятся из имени картинки (`variant_name`), поэтому в базе хранятся
+только размеры оригинала. У анимаций копий нет, и размеры не хранятся:
+по ширине страницы строят `srcset`, не проверяя файлы копий.
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+from core.uploads import too_large
+
+
+# Формат Pillow -> расширение файла
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+    'AVIF': 'avif',
+}
+
+# Длина хеша содержимого в имени файла
+HASH_LENGTH = 32
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def _save_options(image_format):
+    if image_format == 'JPEG':
+        return {
+            'quality': settings.POST_IMAGE_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if image_format in ('WEBP', 'AVIF'):
+        return {'quality': settings.POST_IMAGE_QUALITY}
+    if image_format == 'PNG':
+        return {'optimize': True}
+    return {}
+
+
+def _encode(image, image_format, icc_profile=None):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = _flatten(image)
+    output = io.BytesIO()
+    options = _save_options(image_format)
+    if icc_profile:
+        # Цветовой профиль - единственное, что сохраняется из метаданных
+        options['icc_profile'] = icc_profile
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+def _flatten(image):
+    """RGB без прозрачности (на белом фоне) для форматов без альфа-канала."""
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def hashed_name(content, extension):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f'{digest}.{extension}'
+
+
+def size_error():
+    return f'Файл больше {filesizeformat(settings.MAX_UPLOAD_SIZE)}'
+
+
+def inspect(uploaded_file):
+    """
+    Открывает загрузку и проверяет формат и размеры по заголовку.
+    Пиксели при этом не декодируются.
+    """
+    if too_large(uploaded_file):
+        raise ImageRejected(size_error())
+    uploaded_file.seek(0)
+    try:
+        image = Image.open(uploaded_file)
+    except (OSError, Image.DecompressionBombError):
+        raise ImageRejected('Файл не является картинкой')
+    if image.format not in settings.POST_IMAGE_FORMATS:
+        raise ImageRejected(
+            'Поддерживаются картинки в форматах '
+            + ', '.join(settings.POST_IMAGE_FORMATS)
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ImageRejected(f'Слишком большая картинка: {width}x{height}')
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    if getattr(image, 'is_animated', False) and max(image.size) > max_side:
+        # Анимацию не пересобираем: хранится как есть, если не велика
+        raise ImageRejected(
+            f'Анимация должна быть не больше {max_side}x{max_side}'
+        )
+    return image
+
+
+def process_upload(uploaded_file):
+    """
+    Готовит загруженную картинку к сохранению в Post.image. Возвращает
+    ContentFile с именем по хешу содержимого и размерами в атрибутах
+    `width` и `height` (None у анимаций).
+    """
+    image = inspect(uploaded_file)
+    image_format = image.format
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    if getattr(image, 'is_animated', False):
+        uploaded_file.seek(0)
+        content = uploaded_file.read()
+        width = height = None
+    else:
+        icc_profile = image.info.get('icc_profile')
+        # JPEG декодируется сразу в масштабе 1/2, 1/4 или 1/8
+        image.draft(image.mode, (max_side, max_side))
+        try:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        except (OSError, SyntaxError, ValueError):
+            raise ImageRejected('Не удалось прочитать картинку')
+        content = _encode(image, image_format, icc_profile)
+        width, height = image.size
+    result = ContentFile(
+        content, name=hashed_name(content, EXTENSIONS[image_format])
+    )
+    result.width, result.height = width, height
+    return result
+
+
+def variant_format():
+    """Первый из POST_IMAGE_VARIANT_FORMATS, который умеет сохранять Pillow."""
+    Image.init()
+    for image_format in settings.POST_IMAGE_VARIANT_FORMATS:
+        if image_format in Image.SAVE:
+            return image_format
+    return 'JPEG'
+
+
+def variant_widths(width):
+    """Ширины уменьшенных копий для картинки шириной `width`."""
+    if not width:
+        return []
+    return [w for w in settings.POST_IMAGE_VARIANT_WIDTHS if w < width]
+
+
+def variant_name(image_name, width, image_format=None):
+    stem = os.path.splitext(image_name)[0]
+    extension = EXTENSIONS[image_format or variant_format()]
+    return f'{stem}_{width}w.{extension}'
+
+
+def make_variants(image_name):
+    """
+    Создаёт недостающие уменьшенные копии картинки. Возвращает размеры
+    оригинала, у анимаций - (None, None).
+    """
+    image_format = variant_format()
+    with default_storage.open(image_name) as image_file:
+        image = Image.open(image_file)
+        size = image.size
+        if getattr(image, 'is_animated', False):
+            # Копии были бы без анимации: картинка отдаётся как есть
+            return None, None
+        widths = [
+            width for width in variant_widths(size[0])
+            if not default_storage.exists(
+                variant_name(image_name, width, image_format)
+            )
+        ]
+        if not widths:
+            return size
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        # Палитру и оттенки серого масштабируем в полном цвете
+        has_alpha = 'A' in image.mode or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    for width in widths:
+        height = max(1, round(size[1] * width / size[0]))
+        variant = image.resize((width, height), Image.LANCZOS)
+        default_storage.save(
+            variant_name(image_name, width, image_format),
+            ContentFile(_encode(variant, image_format)),
+        )
+    return size
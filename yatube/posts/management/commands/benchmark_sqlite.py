@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import run_concurrent
+
+
+class Command(BaseCommand):
+    help = (
+        'Чтения ленты в секунду при параллельной записи комментариев: '
+        'стандартный профиль SQLite и профиль из DATABASES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--write-rate', type=float, default=100,
+            help='Всего записей в секунду; 0 - без ограничения.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = run_concurrent(
+                duration=options['duration'],
+                readers=options['readers'],
+                writers=options['writers'],
+                write_rate=options['write_rate'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: чтений {result["reads_per_s"]}/с '
+                f'(p50 {result["read_p50_ms"]} мс, '
+                f'p95 {result["read_p95_ms"]} мс), '
+                f'записей {result["writes_per_s"]}/с, '
+                f'ошибок блокировки {result["locked"]}'
+            )
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import compare, load_baseline, run, save_results
+from posts.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число запросов, p50/p95 и пик памяти страниц posts; '
+        'с --baseline завершается ошибкой при регрессии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reader',
+            help='Пользователь, от лица которого открываются страницы; '
+                 'по умолчанию - самый активный подписчик.'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кеш перед запросами.'
+        )
+        parser.add_argument('--output', help='Сохранить результат в JSON.')
+        parser.add_argument('--baseline', help='JSON с эталоном.')
+        parser.add_argument('--tolerance', type=float, default=0.2)
+
+    def get_reader(self, username):
+        if username:
+            reader = User.objects.filter(username=username).first()
+            if reader is None:
+                raise CommandError(f'Нет пользователя {username}')
+            return reader
+        follow = Follow.objects.order_by('-user__counters__following_count')
+        follow = follow.select_related('user').first()
+        if follow is None:
+            raise CommandError('Нет подписок: сначала выполните seed_posts')
+        return follow.user
+
+    def handle(self, *args, **options):
+        results = run(
+            self.get_reader(options['reader']),
+            repeat=options['repeat'],
+            warm=options['warm'],
+        )
+        self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+        if options['output']:
+            save_results(results, options['output'])
+        if options['baseline']:
+            regressions = compare(
+                results,
+                load_baseline(options['baseline']),
+                options['tolerance'],
+            )
+            if regressions:
+                raise CommandError('\n'.join(regressions))
+            self.stdout.write('Регрессий нет')
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from posts import blobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает ссылки на картинки постов и удаляет картинки, '
+        'на которые не ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int,
+            default=int(blobs.COLLECT_GRACE.total_seconds() // 60),
+            help='Сколько минут картинка без ссылок ещё хранится.'
+        )
+
+    def handle(self, *args, **options):
+        fixed = blobs.reconcile()
+        removed = blobs.collect(timedelta(minutes=options['grace_minutes']))
+        self.stdout.write(
+            f'Исправлено ссылок: {fixed}, удалено картинок: {removed}'
+        )
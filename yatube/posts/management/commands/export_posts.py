@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import FORMATS, WRITERS, export_records, guess_format
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, пользователей, посты с комментариями и '
+        'подписки в NDJSON или CSV (для import_posts).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='Файл; по умолчанию - стандартный вывод.'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='По умолчанию определяется по расширению файла.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['output']
+        write = WRITERS[options['format'] or guess_format(path)]
+        started = time.monotonic()
+        rows = 0
+
+        def counted(records):
+            nonlocal rows
+            for rows, record in enumerate(records, 1):
+                yield record
+
+        if path == '-':
+            write(counted(export_records()), self.stdout)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                write(counted(export_records()), stream)
+        elapsed = time.monotonic() - started
+        # Отчёт - в stderr, чтобы не смешиваться с данными в stdout
+        self.stderr.write(
+            f'Выгружено записей: {rows}, '
+            f'{rows / elapsed if elapsed else 0:.0f} записей/с',
+            style_func=self.style.SUCCESS,
+        )
@@ -0,0 +1,57 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (
+    FORMATS, READERS, Importer, TransferError, guess_format,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает записи, выгруженные export_posts (NDJSON или CSV), '
+        'пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='Файл; по умолчанию - стандартный ввод.'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='По умолчанию определяется по расширению файла.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--media-dir',
+            help='Каталог с картинками постов: копируются в MEDIA_ROOT.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        read = READERS[options['format'] or guess_format(path)]
+        importer = Importer(
+            batch_size=options['batch_size'],
+            media_dir=options['media_dir'],
+            log=self.stdout.write,
+        )
+        try:
+            if path == '-':
+                stats = importer.run(read(sys.stdin))
+            else:
+                with open(path, encoding='utf-8', newline='') as stream:
+                    stats = importer.run(read(stream))
+        except TransferError as error:
+            raise CommandError(f'Импорт прерван: {error}')
+        finally:
+            # Записанные пачки остаются в базе: доводим их до рабочего вида
+            importer.finish()
+        self.stdout.write(
+            ', '.join(f'{name}: {count}' for name, count in sorted(
+                stats.items()
+            ))
+        )
+        self.stdout.write(
+            f'Готово: {importer.rows} строк, {importer.rate():.0f} строк/с'
+        )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими постами для нагрузочных замеров: '
+        'например, --posts 10000, 100000 или 1000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--comments', type=int, default=1,
+            help='Комментариев на пост.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        user_ids = seed(
+            posts=options['posts'],
+            users=options['users'],
+            groups=options['groups'],
+            follows=options['follows'],
+            comments=options['comments'],
+            batch_size=options['batch_size'],
+            random_seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(f'Готово, пользователи с id {user_ids[0]}-'
+                          f'{user_ids[-1]}')
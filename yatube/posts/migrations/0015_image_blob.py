@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:36
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def register_existing_images(apps, schema_editor):
+    # Картинки, загруженные до таблицы ImageBlob: по строке на файл
+    Post = apps.get_model('posts', 'Post')
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    images = Post.objects.exclude(image='').order_by().values(
+        'image'
+    ).annotate(
+        total=Count('pk'),
+        width=Max('image_width'),
+        height=Max('image_height'),
+        thumbnail=Max('thumbnail'),
+    )
+    ImageBlob.objects.bulk_create(
+        (
+            ImageBlob(
+                name=row['image'],
+                refcount=row['total'],
+                width=row['width'],
+                height=row['height'],
+                thumbnail=row['thumbnail'],
+            ) for row in images.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Путь в хранилище')),
+                ('source_hash', models.CharField(blank=True, db_index=True, max_length=64, verbose_name='Хеш загрузки')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота')),
+                ('thumbnail', models.CharField(blank=True, max_length=255, verbose_name='Адрес миниатюры')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')),
+                ('released', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего освобождения')),
+            ],
+        ),
+        migrations.RunPython(
+            register_existing_images, migrations.RunPython.noop
+        ),
+    ]
@@ -19,6 +19,32 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # Поля, которые читают шаблоны лент (includes/publication.html
+    # и ссылки на группу); остальные колонки в ленту не загружаются.
+    FEED_FIELDS = (
+        'id',
+        'text',
+        'pub_date',
+        'updated',
+        'image',
+        'image_width',
+        'image_height',
+        'thumbnail',
+        'author',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group',
+        'group__slug',
+        'group__title',
+    )
+
+    def for_feed(self):
+        """Посты для лент: автор и группа одним запросом с JOIN."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст')
     pub_date = models.DateTimeField(
@@ -26,6 +52,10 @@ class Post(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -45,14 +75,100 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Размеры картинки после обработки (posts/images.py): по ширине
+    # выбираются уменьшенные копии; у анимаций копий и размеров нет
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    thumbnail = models.CharField(
+        verbose_name='Адрес миниатюры',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            # Ленты группы и автора: фильтр и сортировка по ключу
+            # пагинатора (pub_date, id) по одному индексу
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class ImageBlob(models.Model):
+    """
+    Файл картинки в хранилище. Одинаковые загрузки разных постов
+    ссылаются на один файл; `refcount` - число постов с этой картинкой.
+    """
+    name = models.CharField(
+        verbose_name='Путь в хранилище',
+        max_length=255,
+        unique=True
+    )
+    # sha256 загруженного файла до обработки: повторная загрузка той
+    # же картинки находится без декодирования
+    source_hash = models.CharField(
+        verbose_name='Хеш загрузки',
+        max_length=64,
+        blank=True,
+        db_index=True
+    )
+    width = models.PositiveIntegerField(
+        verbose_name='Ширина', blank=True, null=True
+    )
+    height = models.PositiveIntegerField(
+        verbose_name='Высота', blank=True, null=True
+    )
+    thumbnail = models.CharField(
+        verbose_name='Адрес миниатюры',
+        max_length=255,
+        blank=True
+    )
+    refcount = models.PositiveIntegerField(
+        verbose_name='Число ссылок',
+        default=0
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата загрузки',
+        auto_now_add=True
+    )
+    released = models.DateTimeField(
+        verbose_name='Дата последнего освобождения',
+        blank=True,
+        null=True
+    )
+
+    def __str__(self):
+        return self.name
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -72,6 +188,15 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text[:30]
 
@@ -90,5 +215,87 @@ class Follow(models.Model):
         related_name='following'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='prevent_self_follow'
+            ),
+        ]
+
     def __str__(self):
         return self.author.username
+
+
+class UserCounters(models.Model):
+    """Счётчики пользователя, которые показываются на страницах."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='counters'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Число подписок',
+        default=0
+    )
+    fanout_disabled = models.BooleanField(
+        verbose_name='Посты не рассылаются в ленты подписчиков',
+        default=False
+    )
+
+    def __str__(self):
+        return self.user.username
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя (рассылка при публикации)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор поста',
+        related_name='+'
+    )
+    # Копия Post.pub_date: лента читается по индексу (user, pub_date)
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} <- {self.post}'
@@ -0,0 +1,226 @@
+import math
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.http import urlencode
+
+
+# Сколько соседних страниц показывать слева и справа от текущей
+PAGE_WINDOW = 2
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+AFTER = 'a'
+BEFORE = 'b'
+
+
+class Cursor(namedtuple('Cursor', 'direction pub_date pk skip')):
+    """
+    Позиция в ленте: направление (старше/новее), ключ (pub_date, id)
+    поста, от которого идёт отсчёт, и число постов, которые нужно
+    пропустить после него (для ссылок через несколько страниц).
+    """
+
+    def encode(self):
+        micro = (self.pub_date - EPOCH) // MICROSECOND
+        return f'{self.direction}.{micro}.{self.pk}.{self.skip}'
+
+    @classmethod
+    def decode(cls, value):
+        """Разбирает курсор из GET-параметра; при ошибке возвращает None."""
+        try:
+            direction, micro, pk, skip = value.split('.')
+            cursor = cls(
+                direction,
+                EPOCH + int(micro) * MICROSECOND,
+                int(pk),
+                int(skip),
+            )
+        except (AttributeError, ValueError, OverflowError):
+            return None
+        if cursor.direction not in (AFTER, BEFORE) or cursor.skip < 0:
+            return None
+        return cursor
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор по ключу (pub_date, id).
+
+    Страница выбирается условием по ключу соседней страницы вместо
+    OFFSET, а общее число постов не считается: для полосы ссылок
+    достаточно знать, сколько страниц есть в пределах окна впереди.
+    Поэтому после `get_page()` атрибуты `count` и `num_pages` содержат
+    не итог по всей ленте, а то, что известно до конца окна.
+    Номер страницы без курсора (например, `?page=3`) по-прежнему
+    поддерживается через OFFSET, но тоже без COUNT(*).
+    """
+
+    # Поля ключа в `object_list`; ссылки строятся по `key()` объектов
+    # страницы, поэтому поля должны совпадать с ним по значению.
+    date_field = 'pub_date'
+    pk_field = 'pk'
+
+    def __init__(self, object_list, per_page, window=PAGE_WINDOW):
+        super().__init__(object_list, per_page)
+        self.window = window
+        self.page_obj = None
+
+    def wrap(self, rows):
+        """Превращает выбранные строки в объекты страницы."""
+        return rows
+
+    def key(self, obj):
+        """Значения ключа (pub_date, id) объекта страницы."""
+        return obj.pub_date, obj.pk
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return 1
+        return max(number, 1)
+
+    def get_page(self, number, cursor=None):
+        number = self.validate_number(number)
+        cursor = Cursor.decode(cursor) if cursor else None
+        object_list = self.wrap(self._fetch(number, cursor))
+        if not object_list and number > 1:
+            # Устаревшая ссылка или номер за концом ленты
+            number, object_list = 1, self.wrap(self._fetch(1, None))
+        ahead = self._count_ahead(object_list[-1]) if object_list else 0
+        self.count = (number - 1) * self.per_page + len(object_list) + ahead
+        self.num_pages = number + math.ceil(ahead / self.per_page)
+        self.page_obj = self._get_page(object_list, number, self)
+        return self.page_obj
+
+    def page(self, number):
+        return self.get_page(number)
+
+    def _ordered(self, descending=True):
+        fields = (self.date_field, self.pk_field)
+        if descending:
+            fields = tuple(f'-{field}' for field in fields)
+        return self.object_list.order_by(*fields)
+
+    def _older(self, pub_date, pk):
+        return (
+            Q(**{f'{self.date_field}__lt': pub_date})
+            | Q(**{self.date_field: pub_date, f'{self.pk_field}__lt': pk})
+        )
+
+    def _newer(self, pub_date, pk):
+        return (
+            Q(**{f'{self.date_field}__gt': pub_date})
+            | Q(**{self.date_field: pub_date, f'{self.pk_field}__gt': pk})
+        )
+
+    def _fetch(self, number, cursor):
+        if cursor is None:
+            bottom = (number - 1) * self.per_page
+            return list(self._ordered()[bottom:bottom + self.per_page])
+        bottom, top = cursor.skip, cursor.skip + self.per_page
+        if cursor.direction == AFTER:
+            older = self._older(cursor.pub_date, cursor.pk)
+            return list(self._ordered().filter(older)[bottom:top])
+        newer = self._newer(cursor.pub_date, cursor.pk)
+        return list(self._ordered(False).filter(newer)[bottom:top])[::-1]
+
+    def _count_ahead(self, obj):
+        """Сколько постов старше `obj`, но не больше, чем помещается в окно."""
+        limit = self.per_page * self.window
+        older = self._older(*self.key(obj))
+        return self._ordered().filter(older)[:limit].count()
+
+    def query_for(self, number):
+        """GET-параметры ссылки на страницу `number` рядом с текущей."""
+        if number == 1:
+            return urlencode({'page': 1})
+        page = self.page_obj
+        if number > page.number:
+            cursor = Cursor(
+                AFTER,
+                *self.key(page.object_list[-1]),
+                (number - page.number - 1) * self.per_page,
+            )
+        else:
+            cursor = Cursor(
+                BEFORE,
+                *self.key(page.object_list[0]),
+                (page.number - number - 1) * self.per_page,
+            )
+        return urlencode({'page': number, 'cursor': cursor.encode()})
+
+    @property
+    def first_query(self):
+        return self.query_for(1)
+
+    @property
+    def next_query(self):
+        return self.query_for(self.page_obj.number + 1)
+
+    @property
+    def previous_query(self):
+        return self.query_for(self.page_obj.number - 1)
+
+    @property
+    def page_links(self):
+        """Окно номеров страниц вокруг текущей: [(номер, GET-параметры)]."""
+        number = self.page_obj.number
+        first = max(1, number - self.window)
+        return [
+            (i, self.query_for(i) if i != number else '')
+            for i in range(first, self.num_pages + 1)
+        ]
+
+
+class NumberedPaginator(Paginator):
+    """
+    Пагинатор по номеру страницы с тем же набором ссылок для шаблона,
+    что и у CursorPaginator. В ссылки добавляются `params`; если число
+    объектов уже известно (например, из счётчика), COUNT(*) не нужен.
+    """
+
+    def __init__(self, object_list, per_page, params=None,
+                 page_param='page', count=None, window=PAGE_WINDOW):
+        super().__init__(object_list, per_page)
+        self.params = params or {}
+        self.page_param = page_param
+        self.window = window
+        self.page_obj = None
+        if count is not None:
+            self.count = count
+
+    def get_page(self, number):
+        self.page_obj = super().get_page(number)
+        return self.page_obj
+
+    def query_for(self, number):
+        return urlencode({**self.params, self.page_param: number})
+
+    @property
+    def first_query(self):
+        return self.query_for(1)
+
+    @property
+    def next_query(self):
+        return self.query_for(self.page_obj.number + 1)
+
+    @property
+    def previous_query(self):
+        return self.query_for(self.page_obj.number - 1)
+
+    @property
+    def page_links(self):
+        number = self.page_obj.number
+        return [
+            (i, self.query_for(i) if i != number else '')
+            for i in range(
+                max(1, number - self.window),
+                min(self.num_pages, number + self.window) + 1,
+            )
+        ]
@@ -0,0 +1,202 @@
+"""
+Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой POSTS_SEARCH_BACKEND. Основной -
+`SQLiteFTSBackend`: тексты постов лежат в виртуальной таблице FTS5
+(миграция 0013), которую синхронизируют сигналы сохранения и
+удаления поста. После записи в обход сигналов (bulk_create, update())
+индекс пересобирается командой `manage.py rebuild_search_index`.
+
+Запрос пользователя разбирается на слова и фразы в кавычках: пост
+должен содержать все слова и фразы, `слово*` ищет по префиксу.
+"""
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+
+TERM = re.compile(r'"(?P<phrase>[^"]*)"|(?P<word>[^\s"]+)')
+WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    # unicode61 не приравнивает «ё» к «е»
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def parse_query(query):
+    """Фразы и слова запроса: [(слова, поиск по префиксу)]."""
+    terms = []
+    for match in TERM.finditer(normalize(query)):
+        words = WORD.findall(match.group('phrase') or match.group('word'))
+        if words:
+            prefix = bool(match.group('word')) and match.group(0)[-1] == '*'
+            terms.append((words, prefix))
+    return terms
+
+
+class SearchBackend(ABC):
+    """
+    Интерфейс бэкенда поиска. Бэкенду без собственного индекса
+    достаточно поиска: обновление индекса по умолчанию ничего не делает.
+    """
+
+    def index(self, post):
+        """Добавляет или обновляет пост в индексе."""
+
+    def remove(self, post_id):
+        """Убирает пост из индекса."""
+
+    def rebuild(self):
+        """Строит индекс заново по всем постам."""
+
+    @abstractmethod
+    def ranked_ids(self, query, offset, limit):
+        """id найденных постов, лучшие совпадения первыми."""
+
+    @abstractmethod
+    def count(self, query):
+        """Число найденных постов."""
+
+    @abstractmethod
+    def filter(self, queryset, query):
+        """Оставляет в queryset постов только найденные."""
+
+
+class SimpleBackend(SearchBackend):
+    """Поиск через LIKE для баз без полнотекстового индекса."""
+
+    def _matching(self, queryset, query):
+        terms = parse_query(query)
+        if not terms:
+            return queryset.none()
+        condition = Q()
+        for words, _ in terms:
+            condition &= Q(text__icontains=' '.join(words))
+        return queryset.filter(condition)
+
+    def ranked_ids(self, query, offset, limit):
+        posts = self._matching(Post.objects.all(), query)
+        return list(posts.values_list('pk', flat=True)[offset:offset + limit])
+
+    def count(self, query):
+        return self._matching(Post.objects.all(), query).count()
+
+    def filter(self, queryset, query):
+        return self._matching(queryset, query)
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Индекс FTS5, ранжирование по bm25."""
+
+    table = 'posts_post_fts'
+
+    def match(self, query):
+        """
+        Выражение MATCH. Слова и фразы берутся в кавычки, поэтому
+        операторы FTS5 из пользовательского ввода не выполняются.
+        """
+        terms = [
+            '"{}"{}'.format(' '.join(words), '*' if prefix else '')
+            for words, prefix in parse_query(query)
+        ]
+        return ' AND '.join(terms) or None
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)',
+                [post.pk, normalize(post.text)],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, text) '
+                f"SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') "
+                f'FROM posts_post'
+            )
+
+    def ranked_ids(self, query, offset, limit):
+        match = self.match(query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, query):
+        match = self.match(query)
+        if match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s',
+                [match],
+            )
+            return cursor.fetchone()[0]
+
+    def filter(self, queryset, query):
+        match = self.match(query)
+        if match is None:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s',
+            [match],
+        ))
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+class SearchResults:
+    """
+    Ленивый список найденных постов для Paginator: считает и выбирает
+    только нужную страницу.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or get_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        offset = key.start or 0
+        ids = self.backend.ranked_ids(self.query, offset, key.stop - offset)
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
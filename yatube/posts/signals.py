@@ -0,0 +1,231 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache as feed_cache
+from . import blobs, counters, timeline
+from .search import get_backend as search_backend
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+
+def _post_scopes(group_slug, author_username, author_id):
+    scopes = [
+        feed_cache.GLOBAL,
+        feed_cache.author_scope(author_username),
+        feed_cache.author_id_scope(author_id),
+    ]
+    if group_slug is not None:
+        scopes.append(feed_cache.group_scope(group_slug))
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_scopes(sender, instance, **kwargs):
+    """Запоминает группу и автора поста до редактирования."""
+    instance._feed_scopes_before = []
+    instance._image_before = ''
+    if instance.pk is None:
+        return
+    before = Post.objects.filter(pk=instance.pk).values(
+        'group__slug', 'author__username', 'author_id', 'image'
+    ).first()
+    if before is not None:
+        instance._feed_scopes_before = _post_scopes(
+            before['group__slug'], before['author__username'],
+            before['author_id'],
+        )
+        instance._image_before = before['image']
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    group_slug = instance.group.slug if instance.group_id else None
+    feed_cache.bump(
+        *getattr(instance, '_feed_scopes_before', []),
+        *_post_scopes(
+            group_slug, instance.author.username, instance.author_id
+        ),
+        feed_cache.post_scope(instance.pk),
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._slug_before = None
+    if instance.pk is not None:
+        instance._slug_before = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    # Ссылки на группу есть во всех лентах
+    scopes = [feed_cache.GROUPS, feed_cache.group_scope(instance.slug)]
+    slug_before = getattr(instance, '_slug_before', None)
+    if slug_before is not None:
+        scopes.append(feed_cache.group_scope(slug_before))
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_comments(sender, instance, **kwargs):
+    # Число комментариев есть и в списках постов API
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'group__slug', 'author__username', 'author_id'
+    ).first()
+    scopes = [feed_cache.post_scope(instance.post_id)]
+    if post is not None:
+        scopes += _post_scopes(
+            post['group__slug'], post['author__username'], post['author_id']
+        )
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follower_feed(sender, instance, **kwargs):
+    # Профиль автора показывает число подписчиков, профиль
+    # подписчика - число подписок
+    feed_cache.bump(
+        feed_cache.follower_scope(instance.user_id),
+        feed_cache.author_scope(instance.author.username),
+        feed_cache.author_scope(instance.user.username),
+        feed_cache.author_id_scope(instance.author_id),
+        feed_cache.author_id_scope(instance.user_id),
+    )
+
+
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_author_name(sender, instance, update_fields=None, **kwargs):
+    """Запоминает имя пользователя до изменения (его видно в лентах)."""
+    instance._name_before = None
+    if instance.pk is None or (
+        update_fields is not None
+        and not set(update_fields) & set(AUTHOR_NAME_FIELDS)
+    ):
+        return
+    instance._name_before = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*AUTHOR_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, **kwargs):
+    before = getattr(instance, '_name_before', None)
+    after = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if before is None or before == after:
+        return
+    # Имя автора есть в его постах во всех лентах, а имя пользователя -
+    # ещё и в его комментариях
+    scopes = [
+        feed_cache.GLOBAL,
+        feed_cache.author_scope(before[0]),
+        feed_cache.author_scope(instance.username),
+        feed_cache.author_id_scope(instance.pk),
+    ]
+    scopes += [
+        feed_cache.group_scope(slug)
+        for slug in Group.objects.filter(
+            posts__author=instance
+        ).order_by().values_list('slug', flat=True).distinct()
+    ]
+    if before[0] != instance.username:
+        scopes += [
+            feed_cache.post_scope(post_id)
+            for post_id in Comment.objects.filter(
+                author=instance
+            ).order_by().values_list('post_id', flat=True).distinct()
+        ]
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+def _count_follow(follow, delta):
+    counters.change_user_counter(follow.author_id, 'followers_count', delta)
+    counters.change_user_counter(follow.user_id, 'following_count', delta)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        _count_follow(instance, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    _count_follow(instance, -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, **kwargs):
+    before = getattr(instance, '_image_before', '') or ''
+    after = instance.image.name or ''
+    if after != before:
+        blobs.acquire(after)
+        blobs.release(before)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    blobs.release(instance.image.name)
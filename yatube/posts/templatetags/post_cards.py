@@ -0,0 +1,22 @@
+from django import template
+
+from posts import viewer
+from posts.cache import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, user=None):
+    """
+    Карточки постов страницы из кеша: {% post_cards page_obj as cards %}.
+    С `user` в карточках есть кнопки подписки на авторов:
+    {% post_cards page_obj request.user as cards %}
+    """
+    posts = list(posts)
+    following = None
+    if user is not None:
+        following = viewer.follow_states(
+            user, {post.author_id for post in posts}
+        )
+    return render_cards(posts, following=following)
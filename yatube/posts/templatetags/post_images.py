@@ -0,0 +1,49 @@
+"""
+Адаптивные картинки постов.
+
+Уменьшенные копии картинки создаются в фоне вместе с миниатюрой
+(posts/thumbnails.py), поэтому, как только у поста есть миниатюра,
+есть и копии: `srcset` строится по ширине картинки из базы, без
+обращений к хранилищу. Браузер сам выбирает из `srcset` копию под
+ширину экрана; миниатюра остаётся в `src` для браузеров без `srcset`
+и без формата копий.
+"""
+from collections import namedtuple
+
+from django import template
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from posts import images
+from posts.thumbnails import THUMBNAIL_GEOMETRY
+
+
+register = template.Library()
+
+Srcset = namedtuple('Srcset', 'value mime width height')
+
+
+@register.simple_tag
+def post_srcset(post):
+    """
+    Копии картинки поста для `srcset`:
+    {% post_srcset post as srcset %}. `srcset.mime` пуст, если копии
+    в JPEG и их можно отдать прямо в <img>.
+    """
+    width, height = map(int, THUMBNAIL_GEOMETRY.split('x'))
+    name = post.image.name
+    image_format = images.variant_format()
+    variants = [
+        (images.variant_name(name, variant_width, image_format), variant_width)
+        for variant_width in images.variant_widths(post.image_width)
+    ]
+    # У анимаций и картинок, загруженных до появления копий, ширина
+    # не записана и копий нет
+    if not post.thumbnail or not variants:
+        return Srcset('', '', width, height)
+    value = ', '.join(
+        f'{default_storage.url(variant)} {variant_width}w'
+        for variant, variant_width in variants
+    )
+    mime = '' if image_format == 'JPEG' else Image.MIME[image_format]
+    return Srcset(value, mime, width, height)
@@ -0,0 +1,159 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+        cls.post = Post.objects.latest('pub_date')
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        super().setUp()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def walk(self, url, client=None, **params):
+        """Тексты постов со всех страниц по ссылкам next."""
+        texts = []
+        while url:
+            data = self.get_json(url, client, **params)
+            texts.extend(post['text'] for post in data['results'])
+            url, params = data['next'], {}
+        return texts
+
+    def test_feeds(self):
+        """Проверка: ленты отдают все посты по курсору без повторов."""
+        group_url = reverse(
+            'posts:api_group_posts', kwargs={'slug': self.group.slug}
+        )
+        profile_url = reverse(
+            'posts:api_profile_posts',
+            kwargs={'username': self.author.username},
+        )
+        feeds = {
+            reverse('posts:api_posts'): (25, 'Пост 24'),
+            group_url: (12, 'Пост 23'),
+            profile_url: (25, 'Пост 24'),
+        }
+        for url, (total, newest) in feeds.items():
+            with self.subTest(url=url):
+                texts = self.walk(url, limit=10)
+                self.assertEqual(len(texts), total)
+                self.assertEqual(len(set(texts)), total)
+                self.assertEqual(texts[0], newest)
+
+    def test_post_fields(self):
+        """Проверка: пост сериализуется из values() в ожидаемые поля."""
+        post = self.get_json(reverse('posts:api_posts'))['results'][0]
+        self.assertEqual(post['id'], self.post.pk)
+        self.assertEqual(post['author'], self.author.username)
+        self.assertIsNone(post['group'])
+        self.assertEqual(post['comments_count'], 3)
+
+    def test_follow_feed(self):
+        """Проверка: лента подписок доступна только авторизованным."""
+        url = reverse('posts:api_follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(len(self.walk(url, self.reader_client)), 25)
+
+    def test_post_detail_comments(self):
+        """Проверка: пост с комментариями, продолжение по ссылке next."""
+        url = reverse(
+            'posts:api_post_detail', kwargs={'post_id': self.post.pk}
+        )
+        data = self.get_json(url, limit=2)
+        self.assertEqual(data['post']['text'], self.post.text)
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 0', 'Комментарий 1'],
+        )
+        rest = self.get_json(data['next'])
+        self.assertEqual(
+            [comment['text'] for comment in rest['results']],
+            ['Комментарий 2'],
+        )
+        self.assertIsNone(rest['next'])
+
+    def test_not_found(self):
+        """Проверка: несуществующие объекты - 404 в JSON."""
+        urls = [
+            reverse('posts:api_post_detail', kwargs={'post_id': 10 ** 6}),
+            reverse('posts:api_group_posts', kwargs={'slug': 'missing'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', json.loads(response.content))
+
+    def test_gzip_and_etag(self):
+        """Проверка: ответ сжимается по запросу и поддерживает 304."""
+        url = reverse('posts:api_posts')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(
+            gzip.decompress(b''.join(response.streaming_content))
+        )
+        self.assertEqual(len(data['results']), 20)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_after_comment(self):
+        """Проверка: новый комментарий меняет ETag списков постов."""
+        urls = [
+            reverse('posts:api_posts'),
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            reverse('posts:api_profile_posts', args=[self.author.username]),
+        ]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        Comment.objects.create(
+            post=self.group.posts.latest('pub_date'),
+            author=self.reader,
+            text='Новый комментарий',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_num_queries(self):
+        """Проверка: страница ленты - выборка и проверка следующей."""
+        with self.assertNumQueries(2):
+            self.get_json(reverse('posts:api_posts'))
@@ -0,0 +1,64 @@
+import os
+from pathlib import Path
+
+import pytest
+from django.test import TestCase, TransactionTestCase, tag
+
+from posts.benchmark import (
+    compare, load_baseline, run, run_concurrent, seed,
+)
+from posts.models import Post, TimelineEntry, User
+
+
+# Полный прогон на больших объёмах:
+# BENCHMARK_POSTS=100000 pytest -m benchmark yatube/posts/tests
+BENCHMARK_POSTS = int(os.environ.get('BENCHMARK_POSTS', 1000))
+BASELINE = Path(__file__).resolve().parent.parent / 'benchmark_baseline.json'
+
+pytestmark = pytest.mark.benchmark
+
+
+@tag('benchmark')
+class ViewBenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user_ids = seed(
+            posts=BENCHMARK_POSTS, users=10, groups=3, follows=5
+        )
+        cls.reader = User.objects.get(pk=user_ids[0])
+
+    def test_seed_fills_comments_and_timelines(self):
+        """Проверка: у каждого поста есть комментарий, ленты заполнены."""
+        self.assertFalse(Post.objects.filter(comments__isnull=True).exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    def test_query_counts_within_baseline(self):
+        """Проверка: число запросов страниц не выросло относительно эталона."""
+        results = run(self.reader, repeat=1)
+        baseline = {
+            name: {'queries': expected['queries']}
+            for name, expected in load_baseline(BASELINE).items()
+        }
+        self.assertEqual(set(results), set(baseline))
+        self.assertEqual(compare(results, baseline), [], results)
+
+
+@tag('benchmark')
+class ConcurrentBenchmarkTests(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        # Копия базы снимается вне транзакции теста
+        seed(posts=100, users=5, groups=1, follows=2)
+
+    def test_concurrent_profiles(self):
+        """Проверка: при записи обе настройки SQLite читают без блокировок."""
+        results = run_concurrent(duration=0.5, readers=2, writers=1)
+        self.assertEqual(set(results), {'django', 'tuned'})
+        for name, result in results.items():
+            with self.subTest(profile=name):
+                self.assertGreater(result['reads_per_s'], 0)
+                self.assertGreater(result['writes_per_s'], 0)
+                self.assertEqual(result['locked'], 0)
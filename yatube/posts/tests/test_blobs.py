@@ -0,0 +1,149 @@
+import hashlib
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from posts import blobs, images
+from posts.models import ImageBlob, Post
+
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+def make_image(color=(200, 30, 30)):
+    output = io.BytesIO()
+    Image.new('RGB', (700, 400), color).save(output, 'JPEG')
+    return output.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    JOBS_EAGER=True,
+    POST_IMAGE_VARIANT_FORMATS=('WEBP', 'JPEG'),
+)
+class ImageBlobTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self, content, post=None):
+        url = (
+            reverse('posts:post_edit', kwargs={'post_id': post.pk})
+            if post else reverse('posts:post_create')
+        )
+        self.client.post(url, {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('meme.jpg', content),
+        })
+        return Post.objects.latest('id') if post is None else post
+
+    def test_same_upload_stored_once(self):
+        """Проверка: одна и та же картинка хранится и обрабатывается раз."""
+        content = make_image()
+        first = self.upload(content)
+        with mock.patch('posts.images.process_upload') as process, \
+                mock.patch('posts.views.schedule_thumbnail') as schedule:
+            second = self.upload(content)
+        process.assert_not_called()
+        schedule.assert_not_called()
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.thumbnail, first.thumbnail)
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        # Хеш посчитан при приёме файла
+        self.assertEqual(
+            blob.source_hash, hashlib.sha256(content).hexdigest()
+        )
+
+    def test_invalid_form_stores_nothing(self):
+        """Проверка: картинка невалидной формы не сохраняется."""
+        with mock.patch('posts.blobs.default_storage.save') as save:
+            response = self.client.post(reverse('posts:post_create'), {
+                'text': '',
+                'image': SimpleUploadedFile('meme.jpg', make_image()),
+            })
+        self.assertTrue(response.context['form'].errors['text'])
+        save.assert_not_called()
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(Post.objects.exists())
+
+    def test_refcount_and_collect(self):
+        """Проверка: картинка без ссылок удаляется вместе с копиями."""
+        post = self.upload(make_image())
+        old_name = post.image.name
+        old_blob = ImageBlob.objects.get(name=old_name)
+        variants = [
+            images.variant_name(old_name, width)
+            for width in images.variant_widths(old_blob.width)
+        ]
+        self.assertTrue(variants)
+
+        post = self.upload(make_image((30, 30, 200)), post)
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        old_blob.refresh_from_db()
+        self.assertEqual(old_blob.refcount, 0)
+
+        # До истечения срока картинка без ссылок остаётся
+        self.assertEqual(blobs.collect(), 0)
+        self.assertEqual(blobs.collect(grace=timedelta(0)), 1)
+        self.assertFalse(ImageBlob.objects.filter(name=old_name).exists())
+        for name in [old_name, *variants]:
+            self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(post.image.name))
+
+        post.delete()
+        self.assertEqual(ImageBlob.objects.get().refcount, 0)
+
+    def test_reupload_postpones_collect(self):
+        """Проверка: повторно загруженную картинку collect() не удаляет."""
+        content = make_image()
+        post = self.upload(content)
+        name = post.image.name
+        post.delete()
+        ImageBlob.objects.update(released=timezone.now() - timedelta(days=1))
+        blob = blobs.store_upload(
+            SimpleUploadedFile('again.jpg', content, 'image/jpeg')
+        )
+        self.assertEqual(blob.name, name)
+        self.assertEqual(blobs.collect(), 0)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_reconcile(self):
+        """Проверка: ссылки, записанные в обход сигналов, пересчитываются."""
+        post = self.upload(make_image())
+        Post.objects.bulk_create(
+            [Post(text='Копия', author=self.user, image=post.image.name)]
+        )
+        Post.objects.bulk_create(
+            [Post(text='Старая', author=self.user, image='posts/old.jpg')]
+        )
+        self.assertEqual(blobs.reconcile(), 2)
+        self.assertEqual(
+            dict(ImageBlob.objects.values_list('name', 'refcount')),
+            {post.image.name: 2, 'posts/old.jpg': 1},
+        )
+        self.assertEqual(blobs.collect(grace=timedelta(0)), 0)
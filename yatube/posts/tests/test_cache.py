@@ -1,8 +1,15 @@
-from django.test import TestCase, Client
+from unittest import mock
+
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse
 
-from posts.models import Post
+from posts import cache as feed_cache
+from posts.cache import render_cards
+from posts.models import Follow, Group, Post
 
 
 User = get_user_model()
@@ -27,8 +34,8 @@ class PostCacheTests(TestCase):
         )
         # 2. загружаем страницу и сохраняем в переменную
         page_1 = self.client.get('/')
-        # 3. удаляем посты
-        Post.objects.all().delete()
+        # 3. меняем посты в обход сигналов моделей
+        Post.objects.all().update(text='izmenennyi tekst')
         # 4. загружаем страницу и сохраняем в переменную
         page_2 = self.client.get('/')
         # 5. очищаем кеш
@@ -37,3 +44,223 @@ class PostCacheTests(TestCase):
         page_3 = self.client.get('/')
         self.assertEqual(page_1.content, page_2.content)
         self.assertNotEqual(page_1.content, page_3.content)
+
+    def test_new_post_invalidates_index(self):
+        """Проверка: новый пост сразу виден на закешированной главной."""
+        self.client.get(reverse('posts:index'))
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Свежий пост'},
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_deleted_post_invalidates_index(self):
+        """Проверка: удалённый пост сразу пропадает с главной."""
+        post = Post.objects.create(text='Удаляемый пост', author=self.user)
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Удаляемый пост'
+        )
+        post.delete()
+        self.assertNotContains(
+            self.client.get(reverse('posts:index')), 'Удаляемый пост'
+        )
+
+    def test_edit_moves_post_between_group_pages(self):
+        """Проверка: при смене группы обновляются обе страницы групп."""
+        group_1 = Group.objects.create(
+            title='Группа 1', slug='group_1', description='Описание 1'
+        )
+        group_2 = Group.objects.create(
+            title='Группа 2', slug='group_2', description='Описание 2'
+        )
+        post = Post.objects.create(
+            text='Переезжающий пост', author=self.user, group=group_1
+        )
+        url_1 = reverse('posts:group_list', kwargs={'slug': group_1.slug})
+        url_2 = reverse('posts:group_list', kwargs={'slug': group_2.slug})
+        self.assertContains(self.client.get(url_1), 'Переезжающий пост')
+        self.assertNotContains(self.client.get(url_2), 'Переезжающий пост')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Переезжающий пост', 'group': group_2.pk},
+        )
+        self.assertNotContains(self.client.get(url_1), 'Переезжающий пост')
+        self.assertContains(self.client.get(url_2), 'Переезжающий пост')
+
+    def test_follow_invalidates_follow_index(self):
+        """Проверка: подписка сразу меняет ленту подписок."""
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Пост автора', author=author)
+        url = reverse('posts:follow_index')
+        self.assertNotContains(self.authorized_client.get(url), 'Пост автора')
+        Follow.objects.create(user=self.user, author=author)
+        self.assertContains(self.authorized_client.get(url), 'Пост автора')
+
+    def test_other_group_changes_keep_group_page_cached(self):
+        """Проверка: пост в другой группе не сбрасывает кеш группы."""
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        Post.objects.create(text='Пост группы', author=self.user, group=group)
+        url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        self.client.get(url)
+        Post.objects.create(text='Чужой пост', author=self.user, group=other)
+        response = self.client.get(url)
+        self.assertIsNone(response.context)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author_of_the_post')
+        for i in range(3):
+            Post.objects.create(text=f'Тестовый пост {i}', author=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def render_cards(self):
+        with mock.patch(
+            'posts.cache.render_to_string', wraps=render_to_string
+        ) as render:
+            cards = render_cards(Post.objects.for_feed())
+        return cards, render.call_count
+
+    def test_cards_rendered_once(self):
+        """Проверка: карточки отрисовываются один раз и берутся из кеша."""
+        cards_1, rendered_1 = self.render_cards()
+        cards_2, rendered_2 = self.render_cards()
+        self.assertEqual(rendered_1, 3)
+        self.assertEqual(rendered_2, 0)
+        self.assertEqual(
+            [card for post, card in cards_1],
+            [card for post, card in cards_2]
+        )
+
+    def test_edited_post_card_rerendered(self):
+        """Проверка: после правки поста отрисовывается только его карточка."""
+        self.render_cards()
+        post = Post.objects.first()
+        post.text = 'Исправленный текст'
+        post.save()
+        cards, rendered = self.render_cards()
+        self.assertEqual(rendered, 1)
+        self.assertIn('Исправленный текст', cards[0][1])
+
+    def test_renamed_author_cards_rerendered(self):
+        """Проверка: после смены имени автора карточки и лента обновляются."""
+        self.render_cards()
+        self.client.get(reverse('posts:index'))
+        self.user.first_name = 'Новое'
+        self.user.last_name = 'Имя'
+        self.user.save()
+        cards, rendered = self.render_cards()
+        self.assertEqual(rendered, 3)
+        self.assertIn('Новое Имя', cards[0][1])
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Новое Имя'
+        )
+
+    def test_feed_pages_use_cached_cards(self):
+        """Проверка: ленты собираются из тех же карточек."""
+        self.render_cards()
+        with mock.patch(
+            'posts.cache.render_to_string', wraps=render_to_string
+        ) as render:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(render.call_count, 0)
+        self.assertContains(response, 'Тестовый пост 0')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author_of_the_post')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_feed_not_modified(self):
+        """Проверка: неизменённая лента отдаёт 304 без запросов к БД."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_changed_feed_rendered(self):
+        """Проверка: после нового поста лента отдаётся заново."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_follows_comments(self):
+        """Проверка: новый комментарий меняет ETag страницы поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertEqual(
+            self.revalidate(self.authorized_client, url).status_code, 304
+        )
+        etag = self.authorized_client.get(url)['ETag']
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Комментарий'},
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_post_detail_after_rename(self):
+        """Проверка: после смены имени автора страница поста обновляется."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        self.user.username = 'Renamed_author'
+        self.user.save()
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_viewer(self):
+        """Проверка: анонимный и авторизованный пользователь - разные ETag."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        etag = self.client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+
+class CommitTests(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='Author')
+        cache.clear()
+
+    def test_generation_bumped_after_commit(self):
+        """Проверка: после фиксации записи поколение ленты снова меняется."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with transaction.atomic():
+            post = Post.objects.create(text='Новый пост', author=self.user)
+            # Это поколение мог взять читатель, видящий базу до фиксации
+            seen = feed_cache.feed_version(feed_cache.GLOBAL)
+        self.assertNotEqual(feed_cache.feed_version(feed_cache.GLOBAL), seen)
+        self.assertContains(self.client.get(url), post.text)
@@ -0,0 +1,134 @@
+from io import StringIO
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserCounters
+
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_created_with_user(self):
+        """Проверка: у нового пользователя есть нулевые счётчики."""
+        counters = self.counters(self.author)
+        self.assertEqual(counters.posts_count, 0)
+        self.assertEqual(counters.followers_count, 0)
+        self.assertEqual(counters.following_count, 0)
+
+    def test_posts_count(self):
+        """Проверка: число постов меняется при создании и удалении."""
+        post = Post.objects.create(text='Пост 1', author=self.author)
+        Post.objects.create(text='Пост 2', author=self.author)
+        self.assertEqual(self.counters(self.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+
+    def test_counters_not_negative(self):
+        """Проверка: после расхождения счётчики не уходят ниже нуля."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        # Запись в обход сигналов
+        UserCounters.objects.filter(user=self.author).update(posts_count=0)
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+
+    def test_comments_count(self):
+        """Проверка: комментарий через форму увеличивает счётчик поста."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Комментарий'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        post.comments.get().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counts(self):
+        """Проверка: подписка и отписка меняют счётчики обоих."""
+        self.reader_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_user_delete_with_posts(self):
+        """Проверка: удаление автора с постами не ломает счётчики."""
+        Post.objects.create(text='Пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.delete()
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        """Проверка: команда reconcile_counters исправляет расхождения."""
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {i}', author=self.author) for i in range(3)]
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)]
+        )
+        UserCounters.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        author_counters = self.counters(self.author)
+        self.assertEqual(author_counters.posts_count, 3)
+        self.assertEqual(author_counters.followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+
+    def test_follow_updates_both_profiles(self):
+        """Проверка: подписка обновляет закешированные профили обоих."""
+        urls = {
+            user: reverse('posts:profile', kwargs={'username': user.username})
+            for user in (self.author, self.reader)
+        }
+        for url in urls.values():
+            self.client.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(
+            self.client.get(urls[self.author]), 'Подписчиков: 1'
+        )
+        self.assertContains(self.client.get(urls[self.reader]), 'подписок: 1')
+
+    def test_pages_show_counters(self):
+        """Проверка: профиль и пост показывают значения счётчиков."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        UserCounters.objects.filter(user=self.author).update(posts_count=42)
+        cache.clear()
+        response = self.client.get(
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertContains(response, 'Всего постов: 42')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, '42')
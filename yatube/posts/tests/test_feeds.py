@@ -0,0 +1,124 @@
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.feeds import FEED_SIZE
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(2 * FEED_SIZE + 2):
+            Post.objects.create(
+                text=f'Пост <номер> {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_xml(self, url):
+        response = self.client.get(url)
+        if response.streaming:
+            body = b''.join(response.streaming_content)
+        else:
+            body = response.content
+        return response, ElementTree.fromstring(body)
+
+    def test_feeds(self):
+        """Проверка: фиды отдают последние посты в RSS и Atom."""
+        feeds = {
+            'posts:index': {},
+            'posts:group': {'slug': self.group.slug},
+            'posts:profile': {'username': self.author.username},
+        }
+        for name, kwargs in feeds.items():
+            with self.subTest(feed=name):
+                response, rss = self.get_xml(
+                    reverse(f'{name}_rss', kwargs=kwargs)
+                )
+                self.assertIn('rss+xml', response['Content-Type'])
+                items = rss.findall('channel/item')
+                self.assertEqual(len(items), FEED_SIZE)
+                response, atom = self.get_xml(
+                    reverse(f'{name}_atom', kwargs=kwargs)
+                )
+                self.assertIn('atom+xml', response['Content-Type'])
+                self.assertEqual(
+                    len(atom.findall(f'{ATOM}entry')), FEED_SIZE
+                )
+
+    def test_entry(self):
+        """Проверка: запись фида содержит текст, автора и ссылку."""
+        post = Post.objects.latest('pub_date')
+        _, rss = self.get_xml(reverse('posts:index_rss'))
+        item = rss.find('channel/item')
+        self.assertEqual(item.findtext('description'), post.text)
+        self.assertTrue(item.findtext('link').endswith(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        ))
+        self.assertIn('Лев Толстой', item.findtext(
+            '{http://purl.org/dc/elements/1.1/}creator'
+        ))
+
+    def test_cached_and_conditional(self):
+        """Проверка: повтор фида - из кеша, по ETag - 304, новый пост виден."""
+        url = reverse('posts:group_atom', kwargs={'slug': self.group.slug})
+        response, _ = self.get_xml(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertFalse(cached.streaming)
+        self.assertEqual(not_modified.status_code, 304)
+
+        Post.objects.create(
+            text='Свежий пост', author=self.author, group=self.group
+        )
+        response, atom = self.get_xml(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            atom.find(f'{ATOM}entry').findtext(f'{ATOM}summary'),
+            'Свежий пост',
+        )
+
+    def test_cached_per_host(self):
+        """Проверка: фид из кеша содержит ссылки на хост запроса."""
+        url = reverse('posts:index_rss')
+        for host in ('localhost', '127.0.0.1', 'localhost'):
+            with self.subTest(host=host):
+                response = self.client.get(url, HTTP_HOST=host)
+                if response.streaming:
+                    body = b''.join(response.streaming_content)
+                else:
+                    body = response.content
+                link = ElementTree.fromstring(body).findtext('channel/link')
+                self.assertTrue(link.startswith(f'http://{host}/'))
+
+    def test_unknown_group(self):
+        """Проверка: фид несуществующей группы - 404."""
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
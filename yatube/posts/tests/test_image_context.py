@@ -84,8 +84,9 @@ class PostImageAddTests(TestCase):
                          'Тест текст 2. картинка')
         self.assertEqual(latest_post.group,
                          self.group)
-        self.assertEqual(latest_post.image,
-                         'posts/small.gif')
+        # Имя файла - хеш содержимого после обработки картинки
+        self.assertRegex(latest_post.image.name,
+                         r'^posts/[0-9a-f]{32}\.gif$')
         img_context_create = response_create.context.get('page_obj')[0].image
         testing_pages = [
             reverse('posts:index'),
@@ -96,13 +97,15 @@ class PostImageAddTests(TestCase):
         ]
         for name_page in testing_pages:
             with self.subTest(name_page=name_page):
+                # Ленты кешируются, а нужен контекст шаблона
+                cache.clear()
                 response = self.authorized_client.get(name_page)
                 img_context_got = response.context.get('page_obj')[0].image
                 self.assertEqual(img_context_got, img_context_create.name)
         response = self.authorized_client.get(
             reverse('posts:post_detail',
                     kwargs={'post_id': latest_post.id}))
-        img_context_details = response.context.get('posts')[0].image
+        img_context_details = response.context.get('post').image
         self.assertEqual(
             img_context_details,
             img_context_create
@@ -0,0 +1,166 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images
+from posts.models import Post
+
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+def make_image(image_format='JPEG', size=(3000, 1500), exif=True):
+    image = Image.new('RGB', size, (200, 30, 30))
+    output = io.BytesIO()
+    options = {}
+    if exif:
+        metadata = Image.Exif()
+        # Поворот на 90 градусов и модель камеры
+        metadata[0x0112] = 6
+        metadata[0x0110] = 'Камера'
+        options['exif'] = metadata.tobytes()
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    JOBS_EAGER=True,
+    POST_IMAGE_VARIANT_FORMATS=('WEBP', 'JPEG'),
+)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self, content, name='photo.jpg'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фото',
+            'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+        })
+
+    def test_original_processed(self):
+        """Проверка: оригинал повёрнут, уменьшен, без EXIF, имя - хеш."""
+        self.upload(make_image())
+        post = Post.objects.get()
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f]{32}\.jpg$')
+        with default_storage.open(post.image.name) as stored:
+            image = Image.open(stored)
+            # Поворот по EXIF: вертикальная картинка
+            self.assertEqual(image.size, (1024, 2048))
+            self.assertFalse(image.getexif())
+        self.assertEqual(
+            (post.image_width, post.image_height), (1024, 2048)
+        )
+
+    def test_same_content_same_name(self):
+        """Проверка: одинаковые картинки получают одно и то же имя."""
+        content = make_image(size=(400, 300), exif=False)
+        processed = [
+            images.process_upload(SimpleUploadedFile('a.jpg', content)),
+            images.process_upload(SimpleUploadedFile('b.jpg', content)),
+        ]
+        self.assertEqual(processed[0].name, processed[1].name)
+
+    def test_variants(self):
+        """Проверка: уменьшенные копии создаются для ширин меньше оригинала."""
+        self.upload(make_image(size=(1000, 500), exif=False))
+        post = Post.objects.get()
+        self.assertEqual(
+            images.variant_widths(post.image_width), [320, 640, 960]
+        )
+        for width in images.variant_widths(post.image_width):
+            name = images.variant_name(post.image.name, width)
+            self.assertTrue(name.endswith(f'_{width}w.webp'))
+            with default_storage.open(name) as variant:
+                self.assertEqual(Image.open(variant).size[0], width)
+
+    def test_srcset(self):
+        """Проверка: в лентах копии в srcset, картинки ниже первой - lazy."""
+        self.upload(make_image(size=(1000, 500), exif=False))
+        self.upload(make_image(size=(200, 100), exif=False))
+        large, small = Post.objects.order_by('pk')
+        response = self.client.get(reverse('posts:index'))
+        content = response.content.decode()
+        for width in (320, 640, 960):
+            self.assertIn(
+                default_storage.url(
+                    images.variant_name(large.image.name, width)
+                ) + f' {width}w',
+                content,
+            )
+        self.assertIn('<source type="image/webp"', content)
+        # Первым идёт свежий пост: картинка мала для копий и грузится сразу
+        self.assertEqual(content.count('srcset='), 1)
+        self.assertEqual(content.count('loading="eager"'), 1)
+        self.assertEqual(content.count('loading="lazy"'), 1)
+        self.assertLess(
+            content.index(small.thumbnail), content.index('loading="eager"')
+        )
+
+    def test_srcset_without_storage_checks(self):
+        """Проверка: srcset строится без обращений к хранилищу."""
+        self.upload(make_image(size=(1000, 500), exif=False))
+        frames = [Image.new('RGB', (400, 200), color) for color in (
+            (200, 30, 30), (30, 30, 200)
+        )]
+        output = io.BytesIO()
+        frames[0].save(
+            output, 'GIF', save_all=True, append_images=frames[1:]
+        )
+        self.upload(output.getvalue(), 'animation.gif')
+        animation = Post.objects.latest('pk')
+        self.assertIsNone(animation.image_width)
+        with mock.patch(
+            'posts.templatetags.post_images.default_storage.exists'
+        ) as exists:
+            content = self.client.get(reverse('posts:index')).content
+        exists.assert_not_called()
+        # Копии только у первой картинки, у анимации их нет
+        self.assertEqual(content.decode().count('srcset='), 1)
+
+    def test_rejected(self):
+        """Проверка: неподходящие загрузки отклоняются с понятной ошибкой."""
+        cases = {
+            'формат': (make_image('BMP', (10, 10), exif=False), {}),
+            'пиксели': (
+                make_image(size=(100, 100), exif=False),
+                {'POST_IMAGE_MAX_PIXELS': 100},
+            ),
+            'размер файла': (
+                make_image(size=(100, 100), exif=False),
+                {'MAX_UPLOAD_SIZE': 100},
+            ),
+            # Загрузка во временный файл обрывается на MAX_UPLOAD_SIZE
+            'размер файла на диске': (
+                make_image(size=(300, 300), exif=False),
+                {'MAX_UPLOAD_SIZE': 1000, 'FILE_UPLOAD_MAX_MEMORY_SIZE': 0},
+            ),
+        }
+        for case, (content, limits) in cases.items():
+            with self.subTest(case=case), override_settings(**limits):
+                response = self.upload(content)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
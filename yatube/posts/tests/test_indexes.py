@@ -0,0 +1,122 @@
+import re
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'SCAN (TABLE )?(?P<table>\w+)\b(?! USING)')
+
+
+class QueryPlanTests(TestCase):
+    """Основные запросы страниц идут по индексам (EXPLAIN QUERY PLAN)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            post = Post.objects.create(
+                text=f'Тестовый пост {i}', author=cls.author, group=cls.group
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий'
+            )
+        cls.post = post
+
+    def setUp(self):
+        super().setUp()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def query_plans(self, client, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        plans = []
+        for query in queries.captured_queries:
+            if f'FROM "{table}"' not in query['sql']:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(
+                    (query['sql'], [row[-1] for row in cursor.fetchall()])
+                )
+        self.assertTrue(plans, f'Нет запросов к {table} на {url}')
+        return plans
+
+    def assertUsesIndexes(self, plans):
+        for sql, plan in plans:
+            for line in plan:
+                scan = FULL_SCAN.search(line)
+                self.assertFalse(
+                    scan and scan.group('table') != 'subquery',
+                    f'Полный просмотр таблицы: {line}\n{sql}'
+                )
+                self.assertNotIn('TEMP B-TREE', line, sql)
+
+    def test_feed_queries_use_indexes(self):
+        """Проверка: ленты читаются по индексам без сортировки в памяти."""
+        pages = {
+            reverse('posts:index'): 'posts_post',
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}): 'posts_post',
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 'posts_post',
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.pk}): 'posts_comment',
+            reverse('posts:follow_index'): 'posts_timelineentry',
+        }
+        for url, table in pages.items():
+            with self.subTest(url=url):
+                self.assertUsesIndexes(
+                    self.query_plans(self.reader_client, url, table)
+                )
+
+    def test_follow_lookup_uses_unique_index(self):
+        """Проверка: подписка и отписка ищут пару (user, author) по индексу."""
+        urls = [
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertUsesIndexes(
+                    self.query_plans(self.reader_client, url, 'posts_follow')
+                )
+
+
+class FollowConstraintsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Author')
+
+    def test_follow_is_unique(self):
+        """Проверка: повторная подписка не создаёт дубликат."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.user, author=self.author)
+
+    def test_self_follow_forbidden(self):
+        """Проверка: база не даёт подписаться на самого себя."""
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.user, author=self.user)
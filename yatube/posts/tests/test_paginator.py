@@ -2,6 +2,8 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from posts.models import Post, Group
 
@@ -85,3 +87,99 @@ class PaginatorViewsTest(TestCase):
                     ) + '?page=2'
         )
         self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author_of_the_post')
+        # Часть постов с одинаковой датой: порядок задаёт id
+        Post.objects.bulk_create(
+            [
+                Post(
+                    text=f'Тестовый текст для поста {i}',
+                    author=cls.user,
+                ) for i in range(NUMB_OF_POSTS * 5 + 3)
+            ]
+        )
+        same_date = Post.objects.first().pub_date
+        Post.objects.filter(pk__lte=NUMB_OF_POSTS + 5).update(
+            pub_date=same_date
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_next_links_walk_the_whole_feed(self):
+        """Проверка: переходы «Следующая» проходят ленту без пропусков."""
+        seen = []
+        response = self.client.get(reverse('posts:index'))
+        while True:
+            page_obj = response.context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            if not page_obj.has_next():
+                break
+            response = self.client.get(
+                reverse('posts:index') + '?' + page_obj.paginator.next_query
+            )
+        self.assertEqual(seen, self.expected)
+
+    def test_window_links_lead_to_right_pages(self):
+        """Проверка: ссылки окна ведут на страницы с нужными постами."""
+        response = self.client.get(reverse('posts:index') + '?page=3')
+        paginator = response.context['page_obj'].paginator
+        numbers = [number for number, query in paginator.page_links]
+        self.assertEqual(numbers, [1, 2, 3, 4, 5])
+        for number, query in paginator.page_links:
+            if not query:
+                continue
+            with self.subTest(number=number):
+                response = self.client.get(
+                    reverse('posts:index') + '?' + query
+                )
+                page_obj = response.context['page_obj']
+                bottom = (number - 1) * NUMB_OF_POSTS
+                self.assertEqual(page_obj.number, number)
+                self.assertEqual(
+                    [post.pk for post in page_obj],
+                    self.expected[bottom:bottom + NUMB_OF_POSTS]
+                )
+
+    def test_last_page_has_no_next(self):
+        """Проверка: на последней странице нет ссылки вперёд."""
+        response = self.client.get(reverse('posts:index') + '?page=6')
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 3)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+
+    def test_broken_cursor_falls_back_to_page_number(self):
+        """Проверка: испорченный курсор не ломает страницу."""
+        response = self.client.get(
+            reverse('posts:index') + '?page=2&cursor=broken'
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            self.expected[NUMB_OF_POSTS:NUMB_OF_POSTS * 2]
+        )
+
+    def test_no_full_count(self):
+        """Проверка: страница по курсору не считает всю таблицу."""
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        query = response.context['page_obj'].paginator.next_query
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index') + '?' + query)
+        self.assertEqual(len(queries), 2)
+        for captured in queries.captured_queries:
+            self.assertNotIn('OFFSET', captured['sql'])
+            if 'COUNT' in captured['sql']:
+                self.assertIn('LIMIT', captured['sql'])
@@ -0,0 +1,124 @@
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.core.cache import cache
+
+from posts.counters import recount_comments
+from posts.models import Comment, Follow, Post, Group
+from posts.views import NUMB_OF_COMMENTS
+
+
+User = get_user_model()
+
+NUMB_OF_AUTHORS = 5
+
+
+class FeedQueriesTests(TestCase):
+    """Число запросов к БД на страницах лент не зависит от числа постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'Author_{i}',
+                first_name=f'Имя {i}',
+                last_name=f'Фамилия {i}',
+            ) for i in range(NUMB_OF_AUTHORS)
+        ]
+        for author in cls.authors:
+            Post.objects.bulk_create(
+                [
+                    Post(
+                        text=f'Тестовый текст поста {i}',
+                        author=author,
+                        group=cls.group,
+                    ) for i in range(3)
+                ]
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def test_anonymous_feeds_num_queries(self):
+        """Проверка: число запросов на публичных лентах фиксировано."""
+        # Выборка постов с авторами и группами + подсчёт страниц в окне
+        # пагинатора, для группы и профиля ещё поиск самой группы/автора
+        # (вместе со счётчиками).
+        pages_num_queries = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}): 3,
+            reverse('posts:profile',
+                    kwargs={'username': self.authors[0].username}): 3,
+        }
+        for url, num_queries in pages_num_queries.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(num_queries):
+                    self.client.get(url)
+
+    def test_follow_index_num_queries(self):
+        """Проверка: число запросов на ленте подписок фиксировано."""
+        # Сессия и пользователь + проверка авторов без рассылки
+        # + выборка из ленты подписок + подсчёт страниц в окне
+        # + подписки читателя для кнопок в карточках.
+        with self.assertNumQueries(6):
+            self.authorized_client.get(reverse('posts:follow_index'))
+
+    def test_feed_does_not_load_unused_columns(self):
+        """Проверка: лента не загружает лишние поля автора."""
+        post = Post.objects.for_feed().first()
+        deferred = post.author.get_deferred_fields()
+        self.assertIn('password', deferred)
+        self.assertIn('email', deferred)
+        self.assertNotIn('username', deferred)
+
+    def test_post_detail_num_queries(self):
+        """Проверка: число запросов поста не зависит от комментариев."""
+        post = Post.objects.filter(author=self.authors[0]).first()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        # Пост с автором, группой и счётчиками; число комментариев
+        # известно из счётчика, поэтому пустую страницу не выбираем.
+        # При первом запросе ещё ищется автор поста для ETag.
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url, {'comments_page': 1})
+        Comment.objects.bulk_create(
+            Comment(post=post, author=author, text=f'Комментарий {i}')
+            for i, author in enumerate(self.authors * 10)
+        )
+        recount_comments(Post.objects.filter(pk=post.pk))
+        # + страница комментариев с авторами
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), NUMB_OF_COMMENTS)
+
+
+class PostDetailCommentsTests(TestCase):
+    def test_comments_paginated(self):
+        """Проверка: комментарии поста выводятся постранично."""
+        author = User.objects.create_user(username='Author')
+        post = Post.objects.create(text='Тестовый пост', author=author)
+        for i in range(NUMB_OF_COMMENTS + 5):
+            Comment.objects.create(
+                post=post, author=author, text=f'Комментарий {i}'
+            )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        response = self.client.get(url, {'comments_page': 2})
+        comments = response.context['comments']
+        self.assertEqual(comments.paginator.count, NUMB_OF_COMMENTS + 5)
+        self.assertEqual(len(comments), 5)
+        self.assertEqual(comments[0].text, f'Комментарий {NUMB_OF_COMMENTS}')
+        self.assertContains(response, 'comments_page=1')
+        self.assertNotIn('posts', response.context)
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import get_backend
+
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.rare = Post.objects.create(
+            text='Ёжик идёт по лесу', author=cls.user
+        )
+        cls.frequent = Post.objects.create(
+            text='Ёжик, ещё ёжик и снова ёжик', author=cls.user
+        )
+        cls.other = Post.objects.create(
+            text='Лес шумит, ёжик спит', author=cls.user
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_ranked_results(self):
+        """Проверка: чаще встречающееся слово поднимает пост выше."""
+        found = self.search('ежик')
+        self.assertEqual(found[0], self.frequent.pk)
+        self.assertCountEqual(
+            found, [self.rare.pk, self.frequent.pk, self.other.pk]
+        )
+
+    def test_all_words_and_phrases(self):
+        """Проверка: нужны все слова; фраза в кавычках ищется целиком."""
+        self.assertCountEqual(
+            self.search('ёжик лес*'), [self.rare.pk, self.other.pk]
+        )
+        self.assertEqual(self.search('"идёт по лесу"'), [self.rare.pk])
+        self.assertEqual(self.search('"лесу по"'), [])
+
+    def test_fts_syntax_is_escaped(self):
+        """Проверка: операторы FTS5 из запроса не ломают поиск."""
+        for query in ('ёжик OR', 'NEAR(ёжик', '***', '"'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': query}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_index_follows_edit_and_delete(self):
+        """Проверка: индекс обновляется при правке и удалении поста."""
+        post = Post.objects.create(text='Старый текст', author=self.user)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.search('старый'), [])
+        self.assertEqual(self.search('новый'), [post.pk])
+        post.delete()
+        self.assertEqual(self.search('новый'), [])
+
+    def test_pagination(self):
+        """Проверка: результаты делятся на страницы с запросом в ссылках."""
+        Post.objects.bulk_create(
+            Post(text=f'Пагинация {i}', author=self.user) for i in range(15)
+        )
+        get_backend().rebuild()
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'пагинация', 'page': 2}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 15)
+        self.assertEqual(len(page_obj), 5)
+        self.assertIn('q=', page_obj.paginator.previous_query)
+
+    def test_admin_search_uses_index(self):
+        """Проверка: поиск в админке идёт по полнотекстовому индексу."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'лесу'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.rare]
+        )
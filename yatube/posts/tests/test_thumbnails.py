@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.core.cache import cache
+
+from jobs.models import Job
+from jobs.queue import work
+from posts.models import Post
+from posts.thumbnails import generate_thumbnail
+
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author_of_the_post')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def create_post(self, name='small.gif'):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    name=name, content=SMALL_GIF, content_type='image/gif'
+                ),
+            },
+        )
+        return Post.objects.latest('id')
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Проверка: до готовности миниатюры показывается заглушка."""
+        post = self.create_post()
+        self.assertEqual(post.thumbnail, '')
+        self.assertTrue(
+            Job.objects.filter(task=generate_thumbnail.name).exists()
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Картинка обрабатывается')
+
+    def test_thumbnail_generated_after_commit(self):
+        """Проверка: фоновая задача сохраняет адрес миниатюры в посте."""
+        post = self.create_post()
+        self.assertEqual(work(), 1)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail.startswith(settings.MEDIA_URL))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.thumbnail)
+        self.assertNotContains(response, 'Картинка обрабатывается')
+
+    def test_feed_render_does_not_call_sorl(self):
+        """Проверка: страницы не обращаются к sorl во время запроса."""
+        post = self.create_post()
+        work()
+        cache.clear()
+        with mock.patch(
+            'sorl.thumbnail.base.ThumbnailBackend.get_thumbnail'
+        ) as thumb:
+            self.client.get(reverse('posts:index'))
+            self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk})
+            )
+        thumb.assert_not_called()
@@ -0,0 +1,77 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, UserCounters
+from posts.timeline import TimelinePaginator, follow_feed
+
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Author')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def follow_page(self):
+        cache.clear()
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_fanned_out(self):
+        """Проверка: новый пост попадает в таблицу лент подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.follow_page(), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Проверка: подписка добавляет старые посты, отписка убирает."""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.reader_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertEqual(self.follow_page(), posts[::-1])
+        self.reader_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.follow_page(), [])
+
+    def test_fast_path_reads_timeline(self):
+        """Проверка: без популярных авторов лента читается из TimelineEntry."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post_list, paginator_class = follow_feed(self.reader)
+        self.assertIs(post_list.model, TimelineEntry)
+        self.assertIs(paginator_class, TimelinePaginator)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_read_on_demand(self):
+        """Проверка: посты популярного автора подмешиваются при чтении."""
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=other, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(
+            UserCounters.objects.get(user=self.author).fanout_disabled
+        )
+        regular = User.objects.create_user(username='Regular')
+        Follow.objects.create(user=self.reader, author=regular)
+        post_1 = Post.objects.create(text='Пост обычного', author=regular)
+        post_2 = Post.objects.create(
+            text='Пост популярного', author=self.author
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=post_2))
+        self.assertEqual(self.follow_page(), [post_2, post_1])
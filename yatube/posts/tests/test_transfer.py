@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.search import get_backend
+
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_SOURCE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+    shutil.rmtree(TEMP_SOURCE_DIR, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(
+            username='Author', first_name='Лев', last_name='Толстой'
+        )
+        self.reader = User.objects.create_user(username='Reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(5):
+            post = Post.objects.create(
+                text=f'Пост номер {i}',
+                author=self.author,
+                group=self.group if i % 2 else None,
+                image='posts/picture.gif' if i == 0 else '',
+            )
+            for j in range(i):
+                Comment.objects.create(
+                    post=post, author=self.reader, text=f'Ответ {i}.{j}'
+                )
+        Follow.objects.create(user=self.reader, author=self.author)
+        os.makedirs(os.path.join(TEMP_SOURCE_DIR, 'posts'), exist_ok=True)
+        with open(
+            os.path.join(TEMP_SOURCE_DIR, 'posts', 'picture.gif'), 'wb'
+        ) as image:
+            image.write(b'GIF89a')
+
+    def snapshot(self):
+        return {
+            'posts': sorted(Post.objects.values_list(
+                'text', 'pub_date', 'author__username', 'group__slug',
+                'image', 'comments_count',
+            )),
+            'comments': sorted(Comment.objects.values_list(
+                'post__text', 'text', 'created', 'author__username'
+            )),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+            'authors': list(User.objects.filter(username='Author').values(
+                'first_name', 'last_name', 'counters__posts_count',
+                'counters__followers_count',
+            )),
+        }
+
+    def export(self, fmt):
+        out = StringIO()
+        call_command('export_posts', format=fmt, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def reimport(self, data, fmt):
+        path = os.path.join(TEMP_SOURCE_DIR, f'dump.{fmt}')
+        with open(path, 'w', encoding='utf-8', newline='') as dump:
+            dump.write(data)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command(
+            'import_posts', path,
+            batch_size=3, media_dir=TEMP_SOURCE_DIR, stdout=StringIO(),
+        )
+
+    def test_round_trip(self):
+        """Проверка: выгрузка и загрузка в пустую базу сохраняют данные."""
+        before = self.snapshot()
+        for fmt in ('ndjson', 'csv'):
+            with self.subTest(format=fmt):
+                self.reimport(self.export(fmt), fmt)
+                self.assertEqual(self.snapshot(), before)
+
+    def test_dates_kept_without_changing_fields(self):
+        """Проверка: импорт дат не отключает auto_now_add для всех."""
+        bulk_create = Post.objects.bulk_create
+        auto_now_add = []
+
+        def check_field(*args, **kwargs):
+            # Поле модели общее для всех потоков процесса
+            auto_now_add.append(Post._meta.get_field('pub_date').auto_now_add)
+            return bulk_create(*args, **kwargs)
+
+        before = self.snapshot()
+        with mock.patch.object(
+            Post.objects, 'bulk_create', side_effect=check_field
+        ):
+            self.reimport(self.export('ndjson'), 'ndjson')
+        self.assertTrue(auto_now_add)
+        self.assertTrue(all(auto_now_add))
+        self.assertEqual(self.snapshot(), before)
+
+    def test_import_finishes_like_signals(self):
+        """Проверка: после импорта готовы ленты подписок и поиск."""
+        self.reimport(self.export('ndjson'), 'ndjson')
+        reader = User.objects.get(username='Reader')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 5
+        )
+        self.assertEqual(get_backend().count('номер'), 5)
+        self.assertTrue(
+            os.path.isfile(os.path.join(TEMP_MEDIA_ROOT, 'posts/picture.gif'))
+        )
+
+    def test_import_skips_unknown_authors(self):
+        """Проверка: записи с неизвестными авторами пропускаются."""
+        data = (
+            '{"type": "post", "text": "Чужой", "author": "Nobody"}\n'
+            '{"type": "comment", "text": "К чужому", "author": "Reader"}\n'
+            '{"type": "post", "text": "Свой", "author": "Reader"}\n'
+        )
+        path = os.path.join(TEMP_SOURCE_DIR, 'skip.ndjson')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write(data)
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertIn('skipped: 2', out.getvalue())
+        self.assertTrue(Post.objects.filter(text='Свой').exists())
+        self.assertFalse(Comment.objects.filter(text='К чужому').exists())
+
+    def test_malformed_record(self):
+        """Проверка: запись без обязательного поля прерывает импорт."""
+        path = os.path.join(TEMP_SOURCE_DIR, 'broken.ndjson')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write('{"type": "group", "title": "Без слага"}\n')
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, stdout=StringIO())
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import viewer
+from posts.models import Follow, Post
+
+
+User = get_user_model()
+
+
+class ViewerFollowStateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.followed = User.objects.create_user(username='Followed')
+        cls.other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=cls.reader, author=cls.followed)
+        for author in (cls.reader, cls.followed, cls.other):
+            Post.objects.create(text=f'Пост {author.username}', author=author)
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def test_follow_states(self):
+        """Проверка: подписки на всех авторов читаются одним запросом."""
+        authors = [self.reader.pk, self.followed.pk, self.other.pk]
+        expected = {
+            self.reader.pk: None,
+            self.followed.pk: True,
+            self.other.pk: False,
+        }
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                viewer.follow_states(self.reader, authors), expected
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                viewer.follow_states(self.reader, authors), expected
+            )
+        self.assertEqual(
+            viewer.follow_states(AnonymousUser(), authors),
+            dict.fromkeys(authors),
+        )
+
+    def test_follow_invalidates(self):
+        """Проверка: после подписки и отписки состояние перечитывается."""
+        self.assertFalse(viewer.is_following(self.reader, self.other))
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.other.username])
+        )
+        self.assertTrue(viewer.is_following(self.reader, self.other))
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.other.username])
+        )
+        self.assertFalse(viewer.is_following(self.reader, self.other))
+
+    def test_profile_and_cards(self):
+        """Проверка: профиль и карточки ленты показывают состояние подписки."""
+        response = self.client.get(
+            reverse('posts:profile', args=[self.followed.username])
+        )
+        self.assertIs(response.context['following'], True)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.other.username])
+        )
+        self.assertIs(response.context['following'], False)
+
+        unfollow = reverse('posts:profile_unfollow', args=['Followed'])
+        follow = reverse('posts:profile_follow', args=['Other'])
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, unfollow)
+        self.assertContains(response, follow)
+        self.assertNotContains(
+            response, reverse('posts:profile_follow', args=['Reader'])
+        )
+        # Кешированная лента обновляется после подписки
+        self.client.get(follow)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, reverse('posts:profile_unfollow', args=['Other'])
+        )
+        self.assertNotContains(Client().get(reverse('posts:index')), follow)
@@ -0,0 +1,56 @@
+"""
+Фоновая генерация миниатюр картинок постов.
+
+Вьюхи не вызывают sorl во время запроса: после сохранения поста
+генерация ставится в очередь фоновых задач (jobs), а готовый адрес
+миниатюры записывается в `Post.thumbnail`. Пока его нет, шаблоны
+показывают заглушку. Заодно создаются уменьшенные копии картинки для
+разных ширин экрана (posts/images.py).
+"""
+from sorl.thumbnail import get_thumbnail
+
+from jobs.queue import task
+
+from .images import make_variants
+from .models import ImageBlob, Post
+
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {
+    'crop': 'center',
+    'upscale': True,
+}
+# Заглушку видят пользователи: миниатюры идут раньше других задач
+THUMBNAIL_PRIORITY = 10
+
+
+def schedule_thumbnail(post):
+    """Ставит генерацию миниатюры поста в очередь."""
+    return generate_thumbnail.delay(post.pk)
+
+
+@task(priority=THUMBNAIL_PRIORITY, timeout=120)
+def generate_thumbnail(post_id):
+    """Создаёт миниатюру и сохраняет её адрес в посте."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None or not post.image:
+        return
+    image_name = post.image.name
+    thumbnail = get_thumbnail(
+        post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+    )
+    width, height = make_variants(image_name)
+    # Следующие посты с этой картинкой получат миниатюру сразу
+    ImageBlob.objects.filter(name=image_name).update(
+        thumbnail=thumbnail.url, width=width, height=height
+    )
+    # Пока миниатюра считалась, картинку могли заменить
+    if Post.objects.filter(pk=post_id, image=image_name).exists():
+        post.thumbnail = thumbnail.url
+        post.image_width, post.image_height = width, height
+        # save(), а не update(): сигналы сбросят кеш лент и карточку
+        post.save(update_fields=[
+            'thumbnail', 'image_width', 'image_height', 'updated'
+        ])
@@ -0,0 +1,184 @@
+"""
+Лента подписок, рассылаемая при записи (fan-out on write).
+
+При публикации пост копируется в таблицу TimelineEntry каждому
+подписчику автора, при подписке в неё добавляются последние посты
+автора, при отписке они удаляются. Тогда лента подписок читается
+одним проходом по индексу (user, pub_date).
+
+Авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT, рассылать
+слишком дорого: им ставится UserCounters.fanout_disabled, и их посты
+подмешиваются в ленту при чтении (fan-out on read).
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Follow, Post, PostQuerySet, TimelineEntry, UserCounters
+from .paginators import CursorPaginator
+
+
+# Авторов на один INSERT в backfill_authors()
+BACKFILL_AUTHORS_BATCH = 500
+
+
+class TimelinePaginator(CursorPaginator):
+    """Пагинатор по TimelineEntry; на странице - сами посты."""
+    pk_field = 'post_id'
+
+    def wrap(self, rows):
+        return [entry.post for entry in rows]
+
+
+def fanout_disabled(author_id):
+    return UserCounters.objects.filter(
+        user_id=author_id, fanout_disabled=True
+    ).exists()
+
+
+def fan_out(post):
+    """Рассылает новый пост подписчикам автора."""
+    if fanout_disabled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            ) for user_id in followers.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    UserCounters.objects.filter(
+        user_id=follow.author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).update(fanout_disabled=True)
+    if fanout_disabled(follow.author_id):
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_LIMIT]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=follow.user_id,
+                post_id=post_id,
+                author_id=follow.author_id,
+                pub_date=pub_date,
+            ) for post_id, pub_date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(follow):
+    """Убирает посты автора из ленты отписавшегося."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+def rebuild(follows):
+    """Заполняет ленты по подпискам, созданным в обход сигналов."""
+    with transaction.atomic():
+        for follow in follows.iterator():
+            backfill(follow)
+
+
+def backfill_authors(author_ids):
+    """
+    То же, что backfill() для всех подписок на авторов `author_ids`,
+    но одним INSERT ... SELECT на пачку авторов: для лент после
+    массовой загрузки в обход сигналов. Счётчики подписчиков должны
+    быть уже пересчитаны.
+    """
+    author_ids = list(author_ids)
+    for start in range(0, len(author_ids), BACKFILL_AUTHORS_BATCH):
+        chunk = author_ids[start:start + BACKFILL_AUTHORS_BATCH]
+        UserCounters.objects.filter(
+            user_id__in=chunk,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).update(fanout_disabled=True)
+        disabled = set(UserCounters.objects.filter(
+            user_id__in=chunk, fanout_disabled=True
+        ).values_list('user_id', flat=True))
+        chunk = [pk for pk in chunk if pk not in disabled]
+        if not chunk:
+            continue
+        placeholders = ', '.join(['%s'] * len(chunk))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {TimelineEntry._meta.db_table} '
+                f'(user_id, post_id, author_id, pub_date) '
+                f'SELECT follow.user_id, post.id, post.author_id, '
+                f'post.pub_date '
+                f'FROM {Follow._meta.db_table} AS follow JOIN ('
+                f'  SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+                f'    PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+                f'  ) AS position'
+                f'  FROM {Post._meta.db_table}'
+                f'  WHERE author_id IN ({placeholders})'
+                f') AS post ON post.author_id = follow.author_id '
+                f'WHERE post.position <= %s '
+                f'ON CONFLICT DO NOTHING',
+                [*chunk, settings.TIMELINE_BACKFILL_LIMIT],
+            )
+
+
+def _pulled_authors(user):
+    return Follow.objects.filter(
+        user=user, author__counters__fanout_disabled=True
+    ).values('author_id')
+
+
+def follow_feed(user):
+    """
+    Лента подписок пользователя и класс пагинатора для неё.
+
+    Если пользователь подписан на авторов без рассылки, лента собирается
+    из его TimelineEntry и всех постов таких авторов.
+    """
+    pulled_authors = _pulled_authors(user)
+    if not pulled_authors.exists():
+        entries = TimelineEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ).order_by('-pub_date', '-post').only(
+            'pub_date',
+            'post',
+            *(f'post__{field}' for field in PostQuerySet.FEED_FIELDS),
+        )
+        return entries, TimelinePaginator
+    pushed_posts = TimelineEntry.objects.filter(user=user).values('post_id')
+    posts = Post.objects.for_feed().filter(
+        Q(pk__in=pushed_posts) | Q(author_id__in=pulled_authors)
+    )
+    return posts, CursorPaginator
+
+
+def follow_feed_values(user, fields):
+    """
+    Лента подписок как словари с полями поста `fields` для
+    `values()`-выборки: (queryset, поле id поста, префикс полей).
+    """
+    pulled_authors = _pulled_authors(user)
+    if not pulled_authors.exists():
+        entries = TimelineEntry.objects.filter(user=user).values(
+            'pub_date', 'post_id', *(f'post__{field}' for field in fields)
+        ).order_by('-pub_date', '-post_id')
+        return entries, 'post_id', 'post__'
+    pushed_posts = TimelineEntry.objects.filter(user=user).values('post_id')
+    posts = Post.objects.filter(
+        Q(pk__in=pushed_posts) | Q(author_id__in=pulled_authors)
+    ).values(*fields)
+    return posts, 'id', ''
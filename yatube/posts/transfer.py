@@ -0,0 +1,405 @@
+"""
+Перенос постов, комментариев и подписок между базами.
+
+Поток записей - словари с полем `type`: сначала группы и пользователи,
+затем посты, за каждым постом - его комментарии, в конце подписки.
+Комментарии не ссылаются на id поста, поэтому при импорте не нужно
+держать в памяти соответствие старых и новых id: хватает текущей
+пачки. Формат файла - NDJSON (запись на строку) или CSV с общим
+заголовком `CSV_FIELDS`.
+
+Запись идёт через bulk_create пачками по `batch_size` строк, каждая
+пачка - в своей транзакции. bulk_create обходит сигналы, поэтому после
+импорта счётчики, ссылки на картинки, ленты подписок, поисковый индекс
+и поколения кеша лент обновляются отдельно (`Importer.finish()`), а
+миниатюры картинок создаёт команда `manage.py generate_thumbnails`.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache as feed_cache
+from . import blobs, counters, timeline
+from .bulk import UnmatchedPks, batches, bulk_create_dated
+from .models import Comment, Follow, Group, Post, User
+from .search import get_backend as search_backend
+
+
+FORMATS = ('ndjson', 'csv')
+
+CSV_FIELDS = (
+    'type',
+    'username',
+    'first_name',
+    'last_name',
+    'slug',
+    'title',
+    'description',
+    'text',
+    'pub_date',
+    'created',
+    'author',
+    'group',
+    'image',
+    'user',
+)
+
+# Что считается записанными строками в статистике импорта
+ROW_KINDS = ('groups', 'users', 'posts', 'comments', 'follows')
+
+# Размер порции при чтении из базы для экспорта
+EXPORT_CHUNK_SIZE = 2000
+
+
+class TransferError(Exception):
+    pass
+
+
+def guess_format(path):
+    return 'csv' if str(path).lower().endswith('.csv') else 'ndjson'
+
+
+# Экспорт
+
+def export_records():
+    """Все записи базы в порядке, в котором их ожидает импорт."""
+    for group in Group.objects.order_by('pk').values(
+        'slug', 'title', 'description'
+    ).iterator(EXPORT_CHUNK_SIZE):
+        yield {'type': 'group', **group}
+
+    for user in User.objects.order_by('pk').values(
+        'username', 'first_name', 'last_name'
+    ).iterator(EXPORT_CHUNK_SIZE):
+        yield {'type': 'user', **user}
+
+    # Посты и комментарии читаются двумя курсорами, отсортированными
+    # по id поста, и сливаются в один поток
+    comments = Comment.objects.order_by('post_id', 'pk').values_list(
+        'post_id', 'text', 'created', 'author__username'
+    ).iterator(EXPORT_CHUNK_SIZE)
+    comment = next(comments, None)
+    for post in Post.objects.order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'author__username', 'group__slug', 'image'
+    ).iterator(EXPORT_CHUNK_SIZE):
+        post_id, text, pub_date, author, group, image = post
+        yield {
+            'type': 'post',
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'author': author,
+            'group': group,
+            'image': image,
+        }
+        while comment is not None and comment[0] <= post_id:
+            _, text, created, author = comment
+            yield {
+                'type': 'comment',
+                'text': text,
+                'created': created.isoformat(),
+                'author': author,
+            }
+            comment = next(comments, None)
+
+    for user, author in Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username'
+    ).iterator(EXPORT_CHUNK_SIZE):
+        yield {'type': 'follow', 'user': user, 'author': author}
+
+
+def write_ndjson(records, stream):
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def write_csv(records, stream):
+    writer = csv.DictWriter(stream, CSV_FIELDS, restval='')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(
+            {name: '' if value is None else value
+             for name, value in record.items()}
+        )
+
+
+def read_ndjson(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise TransferError(f'Строка {line_number}: {error}')
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+WRITERS = {'ndjson': write_ndjson, 'csv': write_csv}
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+
+# Импорт
+
+def _parse_date(value):
+    date = parse_datetime(value or '')
+    if date is None:
+        return timezone.now()
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Importer:
+    """
+    Пишет поток записей в базу пачками. Авторы и группы ищутся по
+    словарям username -> id и slug -> id, загруженным один раз.
+    Если задан `media_dir`, картинки постов копируются оттуда в
+    хранилище файлов (MEDIA_ROOT).
+    """
+
+    def __init__(self, batch_size=5000, media_dir=None, log=None):
+        self.batch_size = batch_size
+        self.media_dir = media_dir
+        self.log = log or (lambda message: None)
+        self.stats = Counter()
+        self.user_ids = dict(User.objects.values_list('username', 'pk'))
+        self.group_ids = dict(Group.objects.values_list('slug', 'pk'))
+        # Кого затронул импорт: для лент подписок и кеша
+        self.authors = set()
+        self.groups = set()
+        self.followers = set()
+        self.started = None
+
+        self._users = []
+        self._groups = []
+        self._posts = []
+        self._follows = []
+        self._buffered = 0
+
+    def run(self, records):
+        self.started = time.monotonic()
+        handlers = {
+            'group': self._add_group,
+            'user': self._add_user,
+            'post': self._add_post,
+            'comment': self._add_comment,
+            'follow': self._add_follow,
+        }
+        for record in records:
+            handler = handlers.get(record.get('type'))
+            if handler is None:
+                self.stats['skipped'] += 1
+                continue
+            # Пачка не разрывает пост и его комментарии
+            if handler != self._add_comment and (
+                self._buffered >= self.batch_size
+            ):
+                self.flush()
+            try:
+                handler(record)
+            except KeyError as error:
+                raise TransferError(
+                    f'В записи {record} нет поля {error}'
+                )
+            self._buffered += 1
+        self.flush()
+        return self.stats
+
+    @property
+    def rows(self):
+        return sum(self.stats[name] for name in ROW_KINDS)
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed else 0
+
+    # Разбор записей
+
+    def _add_group(self, record):
+        slug = record['slug']
+        if slug in self.group_ids:
+            return
+        self.group_ids[slug] = None
+        self._groups.append(Group(
+            slug=slug,
+            title=record.get('title') or slug,
+            description=record.get('description') or '',
+        ))
+
+    def _add_user(self, record):
+        username = record['username']
+        if username in self.user_ids:
+            return
+        self.user_ids[username] = None
+        self._users.append(User(
+            username=username,
+            first_name=record.get('first_name') or '',
+            last_name=record.get('last_name') or '',
+            password=make_password(None),
+        ))
+
+    def _add_post(self, record):
+        author = record.get('author')
+        group = record.get('group') or None
+        if author not in self.user_ids or (
+            group is not None and group not in self.group_ids
+        ):
+            self.stats['skipped'] += 1
+            # Комментарии пропущенного поста тоже пропускаются
+            self._posts.append(None)
+            return
+        post = Post(
+            text=record['text'],
+            pub_date=_parse_date(record.get('pub_date')),
+            image=record.get('image') or '',
+        )
+        self._posts.append((post, author, group, []))
+
+    def _add_comment(self, record):
+        author = record.get('author')
+        # Комментарий относится к последнему посту потока
+        if not self._posts or self._posts[-1] is None or (
+            author not in self.user_ids
+        ):
+            self.stats['skipped'] += 1
+            return
+        comment = Comment(
+            text=record['text'], created=_parse_date(record.get('created'))
+        )
+        self._posts[-1][3].append((comment, author))
+
+    def _add_follow(self, record):
+        user, author = record.get('user'), record.get('author')
+        if user == author or user not in self.user_ids or (
+            author not in self.user_ids
+        ):
+            self.stats['skipped'] += 1
+            return
+        self._follows.append((user, author))
+
+    # Запись
+
+    def flush(self):
+        try:
+            with transaction.atomic():
+                self._flush_groups()
+                self._flush_users()
+                self._flush_posts()
+                self._flush_follows()
+        except UnmatchedPks as error:
+            raise TransferError(str(error))
+        self._buffered = 0
+        self.log(
+            f'Записано строк: {self.rows}, {self.rate():.0f} строк/с'
+        )
+
+    def _flush_groups(self):
+        if not self._groups:
+            return
+        Group.objects.bulk_create(self._groups)
+        self.group_ids.update(Group.objects.filter(
+            slug__in=[group.slug for group in self._groups]
+        ).values_list('slug', 'pk'))
+        self.groups.update(group.slug for group in self._groups)
+        self.stats['groups'] += len(self._groups)
+        self._groups = []
+
+    def _flush_users(self):
+        if not self._users:
+            return
+        for batch in batches(self._users, 500):
+            User.objects.bulk_create(batch)
+            self.user_ids.update(User.objects.filter(
+                username__in=[user.username for user in batch]
+            ).values_list('username', 'pk'))
+        self.stats['users'] += len(self._users)
+        self._users = []
+
+    def _flush_posts(self):
+        entries = [entry for entry in self._posts if entry is not None]
+        self._posts = []
+        if not entries:
+            return
+        posts = []
+        for post, author, group, comments in entries:
+            post.author_id = self.user_ids[author]
+            if group is not None:
+                post.group_id = self.group_ids[group]
+                self.groups.add(group)
+            post.comments_count = len(comments)
+            if post.image and self.media_dir:
+                post.image = self._copy_image(post.image.name)
+            self.authors.add(author)
+            posts.append(post)
+
+        bulk_create_dated(Post, posts, ['pub_date'])
+
+        comments = []
+        for post, _, _, post_comments in entries:
+            for comment, author in post_comments:
+                comment.post_id = post.pk
+                comment.author_id = self.user_ids[author]
+                comments.append(comment)
+        bulk_create_dated(Comment, comments, ['created'])
+        self.stats['posts'] += len(posts)
+        self.stats['comments'] += len(comments)
+
+    def _flush_follows(self):
+        if not self._follows:
+            return
+        Follow.objects.bulk_create(
+            (
+                Follow(
+                    user_id=self.user_ids[user],
+                    author_id=self.user_ids[author],
+                ) for user, author in self._follows
+            ),
+            ignore_conflicts=True,
+        )
+        for user, author in self._follows:
+            self.followers.add(self.user_ids[user])
+            self.authors.add(author)
+        self.stats['follows'] += len(self._follows)
+        self._follows = []
+
+    def _copy_image(self, name):
+        if default_storage.exists(name):
+            return name
+        source = os.path.join(self.media_dir, name)
+        if not os.path.isfile(source):
+            self.stats['images_missing'] += 1
+            return ''
+        with open(source, 'rb') as image:
+            self.stats['images'] += 1
+            return default_storage.save(name, File(image))
+
+    def finish(self):
+        """Обновляет то, что при обычной записи делают сигналы."""
+        counters.reconcile()
+        blobs.reconcile()
+        timeline.backfill_authors(
+            sorted(self.user_ids[name] for name in self.authors)
+        )
+        search_backend().rebuild()
+        feed_cache.bump(
+            feed_cache.GLOBAL,
+            feed_cache.GROUPS,
+            *(feed_cache.author_scope(name) for name in self.authors),
+            *(
+                feed_cache.author_id_scope(self.user_ids[name])
+                for name in self.authors
+            ),
+            *(feed_cache.group_scope(slug) for slug in self.groups),
+            *(feed_cache.follower_scope(pk) for pk in self.followers),
+        )
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 app_name = 'posts'
 
@@ -14,6 +14,7 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -24,4 +25,23 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('api/posts/', api.post_list, name='api_posts'),
+    path('api/posts/<int:post_id>/',
+         api.post_detail, name='api_post_detail'),
+    path('api/groups/<slug:slug>/posts/',
+         api.group_post_list, name='api_group_posts'),
+    path('api/profiles/<str:username>/posts/',
+         api.profile_post_list, name='api_profile_posts'),
+    path('api/follow/', api.follow_post_list, name='api_follow'),
+    path('feeds/rss/', feeds.index_feed, {'kind': 'rss'}, name='index_rss'),
+    path('feeds/atom/', feeds.index_feed, {'kind': 'atom'},
+         name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_feed, {'kind': 'rss'},
+         name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_feed, {'kind': 'atom'},
+         name='group_atom'),
+    path('profile/<str:username>/rss/', feeds.profile_feed,
+         {'kind': 'rss'}, name='profile_rss'),
+    path('profile/<str:username>/atom/', feeds.profile_feed,
+         {'kind': 'atom'}, name='profile_atom'),
 ]
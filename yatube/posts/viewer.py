@@ -0,0 +1,54 @@
+"""
+Отношения просматривающего пользователя к авторам.
+
+Подписки пользователя читаются одним запросом и кешируются целиком;
+ключ включает поколение области подписок пользователя, которое
+сигналы Follow увеличивают при подписке и отписке (posts/cache.py),
+поэтому после них множество перечитывается. Состояния для всех
+авторов страницы берутся из этого множества без запросов на автора.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import cache as feed_cache
+from .models import Follow
+
+
+FOLLOWING_KEY_PREFIX = 'following'
+
+
+def following_ids(user):
+    """Множество id авторов, на которых подписан `user`."""
+    if not user.is_authenticated:
+        return frozenset()
+    version = feed_cache.feed_version(feed_cache.follower_scope(user.pk))
+    key = f'{FOLLOWING_KEY_PREFIX}:{user.pk}:{version}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user_id=user.pk).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, ids, settings.FEED_CACHE_TIMEOUT)
+    return ids
+
+
+def follow_states(user, author_ids):
+    """
+    {id автора: подписан ли `user`} для авторов страницы. Для гостя и
+    для собственных постов пользователя - None: кнопки подписки нет.
+    """
+    author_ids = set(author_ids)
+    if user is None or not user.is_authenticated:
+        return dict.fromkeys(author_ids)
+    following = following_ids(user)
+    return {
+        author_id: None if author_id == user.pk else author_id in following
+        for author_id in author_ids
+    }
+
+
+def is_following(user, author):
+    """Подписан ли `user` на `author`; None, если подписка невозможна."""
+    return follow_states(user, [author.pk])[author.pk]
@@ -1,35 +1,67 @@
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.cache import cache_page
+
+from core.replicas import read_replica
 
 from .models import Follow, Post, Group, User
+from . import cache as feed_cache
+from . import timeline, viewer
+from .cache import cache_feed, conditional_feed
 from .forms import CommentForm, PostForm
+from .paginators import CursorPaginator, NumberedPaginator
+from .search import SearchResults
+from .thumbnails import schedule_thumbnail
 
 
 NUMB_OF_POSTS = 10
+NUMB_OF_COMMENTS = 20
 
 
-def get_page_object(request, post_list):
-    paginator = Paginator(post_list, NUMB_OF_POSTS)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def viewer_scopes(request):
+    """Области кеша, от которых зависит персональная часть страницы."""
+    if request.user.is_authenticated:
+        return [feed_cache.follower_scope(request.user.id)]
+    return []
 
 
-@cache_page(20, key_prefix="index_page")
+def get_page_object(request, post_list, paginator_class=CursorPaginator):
+    paginator = paginator_class(post_list, NUMB_OF_POSTS)
+    page_number = request.GET.get('page')
+    cursor = request.GET.get('cursor')
+    return paginator.get_page(page_number, cursor)
+
+
+@cache_feed(
+    'index_page',
+    lambda request: [
+        feed_cache.GLOBAL,
+        feed_cache.GROUPS,
+        *viewer_scopes(request),
+    ],
+)
+@read_replica
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     context = {
         'page_obj': get_page_object(request, post_list),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_feed(
+    'group_page',
+    lambda request, slug: [
+        feed_cache.group_scope(slug),
+        *viewer_scopes(request),
+    ],
+)
+@read_replica
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('group')
+    post_list = group.posts.for_feed()
     context = {
         'group': group,
         'page_obj': get_page_object(request, post_list),
@@ -37,27 +69,60 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_feed(
+    'profile_page',
+    lambda request, username: [
+        feed_cache.author_scope(username),
+        feed_cache.GROUPS,
+        *viewer_scopes(request),
+    ],
+)
+@read_replica
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    post_list = author.posts.for_feed()
     context = {
         'author': author,
         'page_obj': get_page_object(request, post_list),
-        'following': author.following,
+        'following': viewer.is_following(request.user, author),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def post_detail_scopes(request, post_id):
+    # Пост и комментарии, счётчик постов автора и названия групп
+    author_id = feed_cache.post_author(post_id)
+    if author_id is None:
+        return None
+    return [
+        feed_cache.post_scope(post_id),
+        feed_cache.author_id_scope(author_id),
+        feed_cache.GROUPS,
+    ]
+
+
+@conditional_feed('post_detail', post_detail_scopes)
+@read_replica
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    posts = Post.objects.all()
-    form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    # Число постов автора и комментариев берётся из счётчиков,
+    # комментарии выбираются постранично вместе с авторами
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'), id=post_id
+    )
+    comments = NumberedPaginator(
+        post.comments.select_related('author').only(
+            'text', 'created', 'post', 'author__username'
+        ),
+        NUMB_OF_COMMENTS,
+        page_param='comments_page',
+        count=post.comments_count,
+    )
     context = {
         'post': post,
-        'posts': posts,
-        'form': form,
-        'comments': comments,
+        'form': CommentForm(request.POST or None),
+        'comments': comments.get_page(request.GET.get('comments_page')),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -68,10 +133,14 @@ def post_create(request):
     form = PostForm(request.POST or None,
                     files=request.FILES or None
                     )
-    if form.is_valid():
+    if form.is_valid() and form.store_image():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # Задача миниатюры ставится в той же транзакции, что и пост
+        with transaction.atomic():
+            post.save()
+            if post.image and not post.thumbnail:
+                schedule_thumbnail(post)
         return redirect('posts:profile', request.user.username)
     context = {
         'form': form,
@@ -91,8 +160,15 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=post
     )
-    if form.is_valid():
-        post.save()
+    if form.is_valid() and form.store_image():
+        # Миниатюру новой картинки форма берёт из уже загруженной копии;
+        # если её нет, до готовности показывается заглушка
+        with transaction.atomic():
+            post.save()
+            if 'image' in form.changed_data and post.image and (
+                not post.thumbnail
+            ):
+                schedule_thumbnail(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -111,29 +187,51 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 @csrf_exempt
+@cache_feed(
+    'follow_page',
+    lambda request: [
+        feed_cache.GLOBAL,
+        feed_cache.GROUPS,
+        *viewer_scopes(request),
+    ],
+)
+@read_replica
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list, paginator_class = timeline.follow_feed(request.user)
     context = {
-        'page_obj': get_page_object(request, post_list),
+        'page_obj': get_page_object(request, post_list, paginator_class),
     }
     return render(request, 'posts/follow.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {'query': query}
+    if query:
+        paginator = NumberedPaginator(
+            SearchResults(query), NUMB_OF_POSTS, params={'q': query}
+        )
+        context['page_obj'] = paginator.get_page(request.GET.get('page'))
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 @csrf_exempt
 def profile_follow(request, username):
     # Подписаться на автора
     author = get_object_or_404(User, username=username)
     if request.user.username != username:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=author)
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=request.user,
+                author=author)
     return redirect('posts:profile', username=username)
 
 
@@ -142,8 +240,9 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     # Отписка
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).delete()
+    with transaction.atomic():
+        Follow.objects.filter(
+            user=request.user,
+            author=author
+        ).delete()
     return redirect('posts:profile', author.username)
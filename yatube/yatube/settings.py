@@ -46,10 +46,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'jobs.apps.JobsConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.RequestMetricsMiddleware',
+    'core.replicas.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,13 +88,58 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединения с SQLite (core/sqlite/base.py): журнал WAL, чтобы читатели
+# не ждали писателей, отображение файла в память, кеш страниц 64 МБ и
+# ожидание блокировки до 5 секунд. Транзакции сразу берут блокировку
+# записи, соединение живёт между запросами и проверяется перед
+# повторным использованием.
+SQLITE_INIT_COMMAND = ';'.join([
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+])
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Копия основной базы, её обновляет команда refresh_replicas;
+    # только чтение. Команда подменяет файл, поэтому соединение
+    # открывается заново на каждый запрос, чтобы видеть свежую копию.
+    # TEST MIRROR отмечает базу как реплику: миграции её не трогают.
+    'replica': {
+        'ENGINE': 'core.sqlite',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'OPTIONS': {
+            'init_command': ';'.join([
+                'PRAGMA query_only=ON',
+                'PRAGMA mmap_size=268435456',
+                'PRAGMA cache_size=-65536',
+            ]),
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Ленты и страница поста читают из реплик (core/replicas.py); пустой
+# список - всё читается из основной базы. После записи клиент
+# REPLICA_PIN_SECONDS читает из основной базы, а страницы из реплики
+# кешируются не дольше REPLICA_CACHE_TIMEOUT.
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 15
+REPLICA_CACHE_TIMEOUT = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -138,8 +186,11 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
 
+# Письма ставятся в исходящую очередь (jobs/mail.py), manage.py
+# send_outbox отправляет их через OUTBOX_EMAIL_BACKEND
+EMAIL_BACKEND = 'jobs.mail.OutboxBackend'
 #  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -148,8 +199,114 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Большие загрузки пишутся на диск по частям; запись прекращается после
+# MAX_UPLOAD_SIZE байт. Попутно считается хеш файла (core/uploads.py)
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.HashingMemoryFileUploadHandler',
+    'core.uploads.LimitedTemporaryFileUploadHandler',
+]
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Картинки постов (posts/images.py): допустимые форматы и размеры,
+# сторона хранимого оригинала, ширины и форматы уменьшенных копий
+# (берётся первый формат, который поддерживает Pillow)
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 2048
+POST_IMAGE_QUALITY = 82
+POST_IMAGE_VARIANT_WIDTHS = (320, 640, 960, 1280)
+POST_IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+
+# Общий для всех воркеров кеш в файле SQLite и LRU в памяти процесса
+# перед ним (core/cache.py). В LRU попадают только ключи, запись по
+# которым не меняется: версионированные карточки, страницы лент и
+# ленты RSS, подписки по поколению и авторы постов. Счётчики поколений
+# меняются, поэтому всегда читаются из общего кеша.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 300,
+            'LOCAL_PREFIXES': [
+                'post_card',
+                'post_author_id',
+                'following',
+                'syndication',
+                'views.decorators.cache.cache_',
+            ],
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# Время жизни страниц лент в кеше; при изменении данных ленты
+# сбрасываются сигналами (см. posts/cache.py)
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Время жизни отрисованных карточек постов; ключ карточки меняется
+# при редактировании поста
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Фоновые задачи (jobs/queue.py): процессы run_workers, размер пачки,
+# пауза при пустой очереди, сколько секунд взятая задача невидима для
+# других исполнителей, задержка первого повтора, как долго хранятся
+# выполненные задачи и как часто они удаляются. С JOBS_EAGER задачи
+# выполняются сразу при постановке.
+JOBS_EAGER = False
+JOBS_WORKERS = 2
+JOBS_BATCH_SIZE = 10
+JOBS_POLL_INTERVAL = 1.0
+JOBS_VISIBILITY_TIMEOUT = 300
+JOBS_RETRY_DELAY = 10
+JOBS_KEEP_DONE = 60 * 60 * 24
+JOBS_PURGE_INTERVAL = 60 * 60
+
+# Исходящие письма (jobs/mail.py): размер пачки на одно соединение,
+# пауза при пустой очереди, сколько секунд взятое письмо невидимо для
+# других отправителей, число попыток, задержка первого повтора и как
+# долго хранятся отправленные письма
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_POLL_INTERVAL = 1.0
+OUTBOX_VISIBILITY_TIMEOUT = 300
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 30
+OUTBOX_KEEP_SENT = 60 * 60 * 24 * 7
+
+# Лента подписок (posts/timeline.py): посты авторов, у которых больше
+# TIMELINE_FANOUT_LIMIT подписчиков, не рассылаются, а читаются при показе
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+# Бэкенд поиска по постам (posts/search.py); для баз, кроме SQLite, -
+# 'posts.search.SimpleBackend'
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+# Метрики запросов (core/metrics.py): число и время SQL, время
+# шаблонов, попадания в кеш. Пишутся в Server-Timing и в лог core.metrics
+REQUEST_METRICS = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
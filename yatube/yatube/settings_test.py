@@ -0,0 +1,21 @@
+"""
+Настройки для тестов: pytest (см. pytest.ini) и
+`manage.py test --settings=yatube.settings_test`.
+
+Тесты очищают кеш, поэтому работают с кешем в памяти, а не с общим
+файлом сервера.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+
+CACHES = {
+    **CACHES,
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}